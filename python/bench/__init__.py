@@ -0,0 +1,116 @@
+"""
+Benchmarks for the channel runtimes.
+
+Every workload runs on each runtime twice: once to time it and collect
+per-message latencies, and once under tracemalloc for its peak memory,
+as tracing allocations slows everything down.
+
+The report also has the bytes an idle channel of each runtime takes up,
+which is what large graphs of mostly idle channels are made of. That part
+covers the threaded runtimes too.
+"""
+import gc
+import importlib
+import platform
+import time
+import tracemalloc
+
+from . import callbacks, coroutines
+
+RUNTIMES = {
+    "v1": callbacks,
+    "v2": callbacks,
+    "v3": coroutines,
+}
+
+# runtimes that run goroutines on several threads at once, which the
+# workloads aren't written for, so only their channels are measured
+SIZE_ONLY = ("threads", "stealing")
+
+# v1 only has unbuffered channels
+UNSUPPORTED = {
+    "v1": {"producer_consumer_1", "producer_consumer_64", "producer_consumer_4096"},
+}
+
+
+def percentiles(samples, ps=(50, 90, 99)):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    result = {f"p{p}": samples[min(len(samples) - 1, len(samples) * p // 100)] for p in ps}
+    result["max"] = samples[-1]
+    return result
+
+
+def reseed(rt, seed):
+    # v1's selects don't take a seed
+    if seed is not None and hasattr(rt, "seed"):
+        rt.seed(seed)
+
+
+def measure(rt, workload, n, params, seed=None):
+    latencies = []
+    reseed(rt, seed)
+    gc.collect()
+    start = time.perf_counter()
+    messages = workload(rt, n, latencies, **params)
+    seconds = time.perf_counter() - start
+
+    reseed(rt, seed)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        workload(rt, n, [], **params)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "messages": messages,
+        "seconds": seconds,
+        "messages_per_second": messages / seconds if seconds else None,
+        "latency_ns": percentiles(latencies),
+        "peak_memory_bytes": peak,
+    }
+
+
+def channel_bytes(rt, capacity=0, count=10000):
+    # the memory an idle channel takes up, on average over `count` of them
+    channels = [None] * count
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for i in range(count):
+            channels[i] = rt.make(capacity) if capacity else rt.make()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size / count
+
+
+def run(runtimes=None, workloads=None, n=10000, seed=None):
+    results = []
+    sizes = {}
+    for name in runtimes or [*RUNTIMES, *SIZE_ONLY]:
+        rt = importlib.import_module(name)
+        sizes[name] = {"unbuffered": channel_bytes(rt)}
+        if "producer_consumer_1" not in UNSUPPORTED.get(name, ()):
+            sizes[name]["buffered_1"] = channel_bytes(rt, 1)
+        if name not in RUNTIMES:
+            continue
+        for workload_name, (workload, params) in RUNTIMES[name].WORKLOADS.items():
+            if workloads and workload_name not in workloads:
+                continue
+            if workload_name in UNSUPPORTED.get(name, ()):
+                continue
+            result = {"runtime": name, "workload": workload_name, "n": n, "params": params}
+            result.update(measure(rt, workload, n, params, seed))
+            results.append(result)
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "time": time.time(),
+        "seed": seed,
+        "results": results,
+        "channel_bytes": sizes,
+    }
@@ -0,0 +1,34 @@
+import argparse
+import json
+
+from . import RUNTIMES, SIZE_ONLY, run
+
+parser = argparse.ArgumentParser(prog="python -m bench", description="benchmark the channel runtimes")
+parser.add_argument("-n", type=int, default=10000, help="messages per workload")
+parser.add_argument("--runtime", action="append", choices=sorted([*RUNTIMES, *SIZE_ONLY]), help="runtimes to run (default: all)")
+parser.add_argument("--workload", action="append", help="workloads to run (default: all)")
+parser.add_argument("--seed", type=int, help="seed the selects for a reproducible run")
+parser.add_argument("--json", metavar="PATH", help="also write the results to PATH")
+args = parser.parse_args()
+
+report = run(args.runtime, args.workload, args.n, args.seed)
+
+print(f"{'runtime':<8} {'workload':<24} {'msgs/s':>12} {'p50 us':>9} {'p99 us':>9} {'peak KiB':>10}")
+for result in report["results"]:
+    latency = result["latency_ns"] or {}
+    p50, p99 = latency.get("p50"), latency.get("p99")
+    print(f"{result['runtime']:<8} {result['workload']:<24} {result['messages_per_second']:>12,.0f} "
+          f"{p50 / 1000 if p50 is not None else float('nan'):>9.1f} "
+          f"{p99 / 1000 if p99 is not None else float('nan'):>9.1f} "
+          f"{result['peak_memory_bytes'] / 1024:>10,.0f}")
+
+print()
+print(f"{'runtime':<8} {'bytes per channel':>18} {'with capacity 1':>16}")
+for name, sizes in report["channel_bytes"].items():
+    buffered = sizes.get("buffered_1")
+    print(f"{name:<8} {sizes['unbuffered']:>18,.0f} "
+          f"{buffered if buffered is not None else float('nan'):>16,.0f}")
+
+if args.json:
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
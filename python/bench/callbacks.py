@@ -0,0 +1,169 @@
+"""
+Workloads for the callback runtimes (v1 and v2).
+
+Each workload takes the runtime module, the number of messages and a list
+to append per-message latencies (in nanoseconds) to. Messages carry the
+time they were sent. It returns the number of messages it moved.
+"""
+import time
+
+now = time.perf_counter_ns
+
+
+def ping_pong(rt, n, latencies):
+    ping, pong = rt.make(), rt.make()
+    remaining = [n]
+
+    def serve(src, dst):
+        def onrecv(sent, ok):
+            if not ok:
+                return
+            latencies.append(now() - sent)
+            remaining[0] -= 1
+            if remaining[0] > 0:
+                rt.send(dst, now(), lambda: serve(src, dst))
+            else:
+                rt.close(dst)
+        rt.recv(src, onrecv)
+
+    rt.go(lambda: serve(ping, pong))
+    rt.go(lambda: serve(pong, ping))
+    rt.go(lambda: rt.send(ping, now(), None))
+    rt.run()
+    return n
+
+
+def producer_consumer(rt, n, latencies, capacity=0):
+    ch = rt.make(capacity) if capacity else rt.make()
+
+    def produce(i):
+        if i < n:
+            rt.send(ch, now(), lambda: produce(i + 1))
+        else:
+            rt.close(ch)
+
+    def consume(sent, ok):
+        if ok:
+            latencies.append(now() - sent)
+            rt.recv(ch, consume)
+
+    rt.go(lambda: produce(0))
+    rt.go(lambda: rt.recv(ch, consume))
+    rt.run()
+    return n
+
+
+def fan_in(rt, n, latencies, k=8):
+    sources = [rt.make() for _ in range(k)]
+    cases = []
+
+    def produce(ch, i, count):
+        if i < count:
+            rt.send(ch, now(), lambda: produce(ch, i + 1, count))
+        else:
+            rt.close(ch)
+
+    def onrecv(ch):
+        def f(sent, ok):
+            if ok:
+                latencies.append(now() - sent)
+            else:
+                cases[:] = [case for case in cases if case[1] is not ch]
+        return f
+
+    def consume():
+        if cases:
+            rt.select(cases, consume)
+
+    for i, ch in enumerate(sources):
+        count = n // k + (1 if i < n % k else 0)
+        rt.go(lambda ch=ch, count=count: produce(ch, 0, count))
+        cases.append((rt.recv, ch, onrecv(ch)))
+    rt.go(consume)
+    rt.run()
+    return n
+
+
+def pipeline(rt, n, latencies, stages=8):
+    channels = [rt.make() for _ in range(stages + 1)]
+
+    def produce(i):
+        if i < n:
+            rt.send(channels[0], now(), lambda: produce(i + 1))
+        else:
+            rt.close(channels[0])
+
+    def forward(src, dst):
+        def onrecv(value, ok):
+            if ok:
+                rt.send(dst, value, lambda: forward(src, dst))
+            else:
+                rt.close(dst)
+        rt.recv(src, onrecv)
+
+    def consume(sent, ok):
+        if ok:
+            latencies.append(now() - sent)
+            rt.recv(channels[-1], consume)
+
+    rt.go(lambda: produce(0))
+    for src, dst in zip(channels, channels[1:]):
+        rt.go(lambda src=src, dst=dst: forward(src, dst))
+    rt.go(lambda: rt.recv(channels[-1], consume))
+    rt.run()
+    return n * stages
+
+
+def spawn_storm(rt, n, latencies):
+    for _ in range(n):
+        rt.go(lambda sent=now(): latencies.append(now() - sent))
+    rt.run()
+    return n
+
+
+def merge_sort(rt, n, latencies):
+    # concurrent_merge_sort from v1/test_merge_sort.py, with a linear merge
+    xs = list(range(n))[::-1]
+
+    def merge(l, r):
+        m, i, j = [], 0, 0
+        while i < len(l) and j < len(r):
+            if r[j] < l[i]:
+                m.append(r[j])
+                j += 1
+            else:
+                m.append(l[i])
+                i += 1
+        m.extend(l[i:])
+        m.extend(r[j:])
+        return m
+
+    def sort(xs, callback):
+        if len(xs) <= 1:
+            callback(xs)
+        else:
+            lc, rc = rt.make(), rt.make()
+            rt.go(lambda: sort(xs[:len(xs)//2], lambda l: rt.send(lc, l, None)))
+            rt.go(lambda: sort(xs[len(xs)//2:], lambda r: rt.send(rc, r, None)))
+            rt.recv(lc, lambda l, ok: rt.recv(rc, lambda r, ok: callback(merge(l, r))))
+
+    result = []
+    sort(xs, result.extend)
+    rt.run()
+    assert result == sorted(xs)
+    # every split sends both halves over a channel
+    return 2 * (n - 1)
+
+
+WORKLOADS = {
+    "ping_pong": (ping_pong, {}),
+    "producer_consumer": (producer_consumer, {}),
+    "producer_consumer_1": (producer_consumer, {"capacity": 1}),
+    "producer_consumer_64": (producer_consumer, {"capacity": 64}),
+    "producer_consumer_4096": (producer_consumer, {"capacity": 4096}),
+    "fan_in_8": (fan_in, {"k": 8}),
+    "fan_in_64": (fan_in, {"k": 64}),
+    "pipeline_8": (pipeline, {"stages": 8}),
+    "spawn_storm": (spawn_storm, {}),
+    "merge_sort": (merge_sort, {}),
+}
@@ -0,0 +1,171 @@
+"""
+Workloads for the asyncio runtime (v3), the same as in callbacks.py.
+"""
+import asyncio
+import time
+
+now = time.perf_counter_ns
+
+
+def ping_pong(rt, n, latencies):
+    async def serve(src, dst, first):
+        if first:
+            await rt.send(dst, now())
+        while True:
+            sent, ok = await rt.recv(src)
+            if not ok:
+                return
+            latencies.append(now() - sent)
+            if len(latencies) >= n:
+                rt.close(dst)
+                return
+            await rt.send(dst, now())
+
+    async def main():
+        ping, pong = rt.make(), rt.make()
+        rt.go(serve(ping, pong, True))
+        await serve(pong, ping, False)
+
+    asyncio.run(main())
+    return n
+
+
+def producer_consumer(rt, n, latencies, capacity=0):
+    async def produce(ch):
+        for _ in range(n):
+            await rt.send(ch, now())
+        rt.close(ch)
+
+    async def main():
+        ch = rt.make(capacity)
+        rt.go(produce(ch))
+        while True:
+            sent, ok = await rt.recv(ch)
+            if not ok:
+                return
+            latencies.append(now() - sent)
+
+    asyncio.run(main())
+    return n
+
+
+def fan_in(rt, n, latencies, k=8):
+    async def produce(ch, count):
+        for _ in range(count):
+            await rt.send(ch, now())
+        rt.close(ch)
+
+    async def main():
+        cases = []
+
+        def onrecv(ch):
+            async def f(sent, ok):
+                if ok:
+                    latencies.append(now() - sent)
+                else:
+                    cases[:] = [case for case in cases if case[1] is not ch]
+            return f
+
+        for i in range(k):
+            ch = rt.make()
+            rt.go(produce(ch, n // k + (1 if i < n % k else 0)))
+            cases.append((rt.recv, ch, onrecv(ch)))
+        while cases:
+            await rt.select(list(cases))
+
+    asyncio.run(main())
+    return n
+
+
+def pipeline(rt, n, latencies, stages=8):
+    async def produce(ch):
+        for _ in range(n):
+            await rt.send(ch, now())
+        rt.close(ch)
+
+    async def forward(src, dst):
+        while True:
+            value, ok = await rt.recv(src)
+            if not ok:
+                rt.close(dst)
+                return
+            await rt.send(dst, value)
+
+    async def main():
+        channels = [rt.make() for _ in range(stages + 1)]
+        rt.go(produce(channels[0]))
+        for src, dst in zip(channels, channels[1:]):
+            rt.go(forward(src, dst))
+        while True:
+            sent, ok = await rt.recv(channels[-1])
+            if not ok:
+                return
+            latencies.append(now() - sent)
+
+    asyncio.run(main())
+    return n * stages
+
+
+def spawn_storm(rt, n, latencies):
+    async def goroutine(sent, done):
+        latencies.append(now() - sent)
+        await rt.send(done, None)
+
+    async def main():
+        done = rt.make(n)
+        for _ in range(n):
+            rt.go(goroutine(now(), done))
+        for _ in range(n):
+            await rt.recv(done)
+
+    asyncio.run(main())
+    return n
+
+
+def merge_sort(rt, n, latencies):
+    # the same merge sort as in callbacks.py, with a channel per half
+    xs = list(range(n))[::-1]
+
+    def merge(l, r):
+        m, i, j = [], 0, 0
+        while i < len(l) and j < len(r):
+            if r[j] < l[i]:
+                m.append(r[j])
+                j += 1
+            else:
+                m.append(l[i])
+                i += 1
+        m.extend(l[i:])
+        m.extend(r[j:])
+        return m
+
+    async def sort(xs):
+        if len(xs) <= 1:
+            return xs
+        lc, rc = rt.make(), rt.make()
+        rt.go(sort_into(xs[:len(xs)//2], lc))
+        rt.go(sort_into(xs[len(xs)//2:], rc))
+        l, _ = await rt.recv(lc)
+        r, _ = await rt.recv(rc)
+        return merge(l, r)
+
+    async def sort_into(xs, ch):
+        await rt.send(ch, await sort(xs))
+
+    assert asyncio.run(sort(xs)) == sorted(xs)
+    # every split sends both halves over a channel
+    return 2 * (n - 1)
+
+
+WORKLOADS = {
+    "ping_pong": (ping_pong, {}),
+    "producer_consumer": (producer_consumer, {}),
+    "producer_consumer_1": (producer_consumer, {"capacity": 1}),
+    "producer_consumer_64": (producer_consumer, {"capacity": 64}),
+    "producer_consumer_4096": (producer_consumer, {"capacity": 4096}),
+    "fan_in_8": (fan_in, {"k": 8}),
+    "fan_in_64": (fan_in, {"k": 64}),
+    "pipeline_8": (pipeline, {"stages": 8}),
+    "spawn_storm": (spawn_storm, {}),
+    "merge_sort": (merge_sort, {}),
+}
@@ -0,0 +1,15 @@
+import json
+from . import RUNTIMES, SIZE_ONLY, run
+
+
+def test_run_all_workloads():
+    report = run(n=50)
+    assert json.loads(json.dumps(report)) == report
+    assert {result["runtime"] for result in report["results"]} == set(RUNTIMES)
+    assert set(report["channel_bytes"]) == {*RUNTIMES, *SIZE_ONLY}
+    for result in report["results"]:
+        assert result["messages"] > 0
+        assert result["messages_per_second"] > 0
+        assert result["peak_memory_bytes"] > 0
+        if result["workload"] != "merge_sort":
+            assert result["latency_ns"]["p50"] <= result["latency_ns"]["p99"] <= result["latency_ns"]["max"]
@@ -0,0 +1,180 @@
+from multiprocessing import resource_tracker, shared_memory
+import builtins
+import multiprocessing
+import os
+import struct
+import time
+import weakref
+
+
+# The channel's shared memory starts with a header followed by `capacity`
+# slots. Each slot has a sequence number, the length of its payload and
+# `slot_size` bytes for the payload itself. As in Dmitry Vyukov's bounded
+# MPMC queue, a slot at position `pos` can be written once its sequence is
+# `pos` and read once it is `pos + 1`, so the lock is only held while
+# claiming a position and the copying happens outside of it.
+
+# head, tail, closed
+HEADER = struct.Struct("qqq")
+SEQUENCE = struct.Struct("q")
+LENGTH = struct.Struct("q")
+SLOT_HEADER = SEQUENCE.size + LENGTH.size
+
+
+def unlink(name, owner):
+    if os.getpid() == owner:
+        try:
+            segment = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return
+        segment.close()
+        segment.unlink()
+
+
+def attach(name):
+    segment = shared_memory.SharedMemory(name=name)
+    # only the process that created the segment should unlink it
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+class Channel:
+    def __init__(self, capacity, slot_size):
+        if capacity < 1:
+            raise ValueError("shared memory channels must be buffered")
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.stride = SLOT_HEADER + slot_size
+        self.segment = shared_memory.SharedMemory(
+            create=True, size=HEADER.size + capacity * self.stride)
+        self.buf = self.segment.buf
+        # guards head, tail and closed
+        self.lock = multiprocessing.Lock()
+        # count the slots ready to be read and the ones free to be written
+        self.items = multiprocessing.Semaphore(0)
+        self.spaces = multiprocessing.Semaphore(capacity)
+        # the position of the slot behind the view the last recv returned
+        self.held = None
+
+        HEADER.pack_into(self.buf, 0, 0, 0, 0)
+        for pos in range(capacity):
+            SEQUENCE.pack_into(self.buf, self.offset(pos), pos)
+        weakref.finalize(self, unlink, self.segment.name, os.getpid())
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["segment"] = self.segment.name
+        del state["buf"]
+        state["held"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.segment = attach(state["segment"])
+        self.buf = self.segment.buf
+
+    def offset(self, pos):
+        return HEADER.size + (pos % self.capacity) * self.stride
+
+    def wait_for(self, offset, sequence):
+        # only spins when another goroutine claimed an earlier position and
+        # hasn't finished copying yet
+        while SEQUENCE.unpack_from(self.buf, offset)[0] != sequence:
+            time.sleep(0)
+
+
+# Scheduling Methods
+
+def go(callback, *args):
+    # goroutines are processes, channels are passed to them as arguments
+    process = multiprocessing.Process(target=callback, args=args, daemon=True)
+    process.start()
+    return process
+
+
+# Channel Methods
+
+def make(capacity=1, slot_size=4096):
+    return Channel(capacity, slot_size)
+
+
+def len(channel):
+    head, tail, _ = HEADER.unpack_from(channel.buf, 0)
+    return tail - head
+
+
+def cap(channel):
+    return channel.capacity
+
+
+def send(channel, value):
+    value = memoryview(value).cast("B")
+    size = builtins.len(value)
+    if size > channel.slot_size:
+        raise ValueError("value does not fit in a slot")
+
+    buf = channel.buf
+    channel.spaces.acquire()
+    with channel.lock:
+        head, tail, closed = HEADER.unpack_from(buf, 0)
+        # "A send on a closed channel proceeds by causing a run-time panic."
+        if closed:
+            # pass the wake up on to the next blocked sender
+            channel.spaces.release()
+            raise Exception("send on closed channel")
+        HEADER.pack_into(buf, 0, head, tail + 1, closed)
+
+    offset = channel.offset(tail)
+    channel.wait_for(offset, tail)
+    buf[offset + SLOT_HEADER:offset + SLOT_HEADER + size] = value
+    LENGTH.pack_into(buf, offset + SEQUENCE.size, size)
+    SEQUENCE.pack_into(buf, offset, tail + 1)
+    channel.items.release()
+
+
+def recv(channel):
+    # Returns a view of the value in shared memory, without copying it. The
+    # view is only valid until the next recv on the channel in this process
+    # (or release), use bytes(view) to keep the value.
+    release(channel)
+
+    buf = channel.buf
+    channel.items.acquire()
+    with channel.lock:
+        head, tail, closed = HEADER.unpack_from(buf, 0)
+        # "A receive operation on a closed channel can always proceed immediately,
+        # yielding the element type's zero value after any previously sent values have been received."
+        if head == tail:
+            # only close wakes us up with nothing to read, so pass it on
+            channel.items.release()
+            return None, False
+        HEADER.pack_into(buf, 0, head + 1, tail, closed)
+
+    offset = channel.offset(head)
+    channel.wait_for(offset, head + 1)
+    size = LENGTH.unpack_from(buf, offset + SEQUENCE.size)[0]
+    channel.held = head
+    return buf[offset + SLOT_HEADER:offset + SLOT_HEADER + size], True
+
+
+def release(channel):
+    # hand the slot behind the last received view back to the senders
+    if channel.held is not None:
+        offset = channel.offset(channel.held)
+        SEQUENCE.pack_into(channel.buf, offset, channel.held + channel.capacity)
+        channel.held = None
+        channel.spaces.release()
+
+
+def close(channel):
+    with channel.lock:
+        head, tail, closed = HEADER.unpack_from(channel.buf, 0)
+        # if the channel is already closed, we panic
+        if closed:
+            raise Exception("close of closed channel")
+        HEADER.pack_into(channel.buf, 0, head, tail, 1)
+
+    # wake up one blocked receiver and one blocked sender, each of them
+    # passes it on to the next
+    channel.items.release()
+    channel.spaces.release()
@@ -0,0 +1,58 @@
+from . import close, go, len, cap, make, recv, release, send
+
+
+def produce(channel, n):
+    for i in range(n):
+        send(channel, i.to_bytes(4, "little") * 4)
+    close(channel)
+
+
+def test_send_between_processes():
+    ch = make(64, slot_size=16)
+    producer = go(produce, ch, 10000)
+
+    received = 0
+    while True:
+        view, ok = recv(ch)
+        if not ok:
+            break
+        assert isinstance(view, memoryview)
+        assert view == received.to_bytes(4, "little") * 4
+        received += 1
+    producer.join()
+    assert received == 10000
+    assert producer.exitcode == 0
+
+
+def produce_numbers(channel, n):
+    for i in range(n):
+        send(channel, i.to_bytes(4, "little"))
+
+
+def test_many_producers():
+    ch = make(8, slot_size=4)
+    producers = [go(produce_numbers, ch, 500) for _ in range(4)]
+    values = []
+    for _ in range(2000):
+        values.append(int.from_bytes(recv(ch)[0], "little"))
+    for producer in producers:
+        producer.join()
+    assert sorted(values) == sorted(list(range(500)) * 4)
+
+
+def test_buffering_in_one_process():
+    ch = make(2, slot_size=8)
+    send(ch, b"a")
+    send(ch, bytearray(b"bc"))
+    assert len(ch) == 2 and cap(ch) == 2
+    assert recv(ch) == (b"a", True)
+    release(ch)
+    close(ch)
+    assert recv(ch)[0] == b"bc"
+    assert recv(ch) == (None, False)
+    raised = False
+    try:
+        send(ch, b"d")
+    except Exception:
+        raised = True
+    assert raised
@@ -0,0 +1,441 @@
+"""
+The callback runtime (v2's go/send/recv/close/select) on a work-stealing
+scheduler with a pool of worker threads.
+
+Each worker owns a deque of ready callbacks. Callbacks started by a worker
+go on its own deque, which it runs newest first, and a worker that runs
+out steals the oldest callbacks from its peers. Channels are guarded by a
+lock each, and callbacks a channel operation resumes are started with go()
+on the worker that completed it.
+
+Callbacks only run in parallel where they release the GIL (or on a free
+threaded build of Python). v2's single threaded run() is still the
+default, this is opt-in:
+
+    from stealing import go, make, recv, run, send
+"""
+from collections import deque
+from random import shuffle
+import builtins
+import os
+import threading
+
+
+class Waiter:
+    __slots__ = ("value", "callback", "live", "selection", "case")
+
+    def __init__(self, value, callback, selection=None, case=None):
+        self.value = value
+        self.callback = callback
+        self.live = True
+        # set when the waiter is one of the cases of a blocked select
+        self.selection = selection
+        self.case = case
+
+
+class WaitingQueue:
+    # once more than this many cancelled waiters are left in the deque (and
+    # they outnumber the rest) it is rebuilt without them
+    compact_threshold = 64
+
+    __slots__ = ("waiters", "dead")
+
+    def __init__(self):
+        self.waiters = deque()
+        self.dead = 0
+
+    def enqueue(self, waiter):
+        self.waiters.append(waiter)
+
+    def dequeue(self):
+        # returns the first waiter that can still be woken, or None. Waiters
+        # of a select are only handed out once, to whoever claims it first.
+        waiters = self.waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.live:
+                self.dead -= 1
+                continue
+            waiter.live = False
+            if waiter.selection is None or waiter.selection.claim(waiter):
+                return waiter
+        return None
+
+    def cancel(self, waiter):
+        if not waiter.live:
+            return
+        waiter.live = False
+        self.dead += 1
+        if self.dead > self.compact_threshold and self.dead > builtins.len(self.waiters) - self.dead:
+            self.waiters = deque(w for w in self.waiters if w.live)
+            self.dead = 0
+
+
+class NoWaiters:
+    # Stands in for a channel's WaitingQueue until a goroutine parks on it.
+    # Plenty of channels never have anything parked on one side of them, or
+    # on either, and so never need the queue and its deque.
+    __slots__ = ()
+
+    waiters = ()
+
+    def dequeue(self):
+        return None
+
+
+no_waiters = NoWaiters()
+
+
+# unbuffered channels never append to their buffer, so they all share this
+# empty one
+unbuffered = ()
+
+
+class Channel:
+    __slots__ = ("capacity", "buffer", "closed", "waiting_to_send", "waiting_to_recv", "lock")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = deque() if capacity else unbuffered
+        self.closed = False
+        # see send_queue and recv_queue
+        self.waiting_to_send = no_waiters
+        self.waiting_to_recv = no_waiters
+        # guards everything above
+        self.lock = threading.Lock()
+
+    def send_queue(self):
+        # the queue of blocked senders, made when the first one parks. The
+        # caller holds the lock.
+        if self.waiting_to_send is no_waiters:
+            self.waiting_to_send = WaitingQueue()
+        return self.waiting_to_send
+
+    def recv_queue(self):
+        if self.waiting_to_recv is no_waiters:
+            self.waiting_to_recv = WaitingQueue()
+        return self.waiting_to_recv
+
+
+# Scheduling Methods
+
+class Worker:
+    __slots__ = ("tasks", "steals", "runs")
+
+    def __init__(self):
+        self.tasks = deque()
+        # how many callbacks it stole and ran, for tuning
+        self.steals = 0
+        self.runs = 0
+
+
+class Scheduler:
+    def __init__(self):
+        self.workers = []
+        # callbacks started from outside of the workers
+        self.injected = deque()
+        # callbacks started but not finished yet, run() returns at 0
+        self.pending = 0
+        self.sleepers = 0
+        self.condition = threading.Condition()
+        self.local = threading.local()
+        self.error = None
+
+    def go(self, callback, args):
+        worker = getattr(self.local, "worker", None)
+        with self.condition:
+            # counted before it's queued, or a thief could run it and bring
+            # pending to 0 while other callbacks are still to come
+            self.pending += 1
+            (self.injected if worker is None else worker.tasks).append((callback, args))
+            if self.sleepers:
+                self.condition.notify()
+
+    def find(self, worker):
+        # the next callback for the worker: its newest one, or else the
+        # oldest one of a peer
+        try:
+            return worker.tasks.pop()
+        except IndexError:
+            pass
+        try:
+            return self.injected.popleft()
+        except IndexError:
+            pass
+        for peer in self.workers:
+            if peer is not worker:
+                try:
+                    task = peer.tasks.popleft()
+                except IndexError:
+                    continue
+                worker.steals += 1
+                return task
+        return None
+
+    def idle(self):
+        # the caller holds the condition's lock
+        return not self.injected and not any(worker.tasks for worker in self.workers)
+
+    def work(self, worker):
+        self.local.worker = worker
+        while self.error is None:
+            task = self.find(worker)
+            if task is None:
+                with self.condition:
+                    if self.pending == 0 or self.error is not None:
+                        self.condition.notify_all()
+                        return
+                    if self.idle():
+                        self.sleepers += 1
+                        self.condition.wait()
+                        self.sleepers -= 1
+                continue
+            callback, args = task
+            try:
+                callback(*args)
+            except BaseException as e:
+                with self.condition:
+                    if self.error is None:
+                        self.error = e
+                    self.condition.notify_all()
+            worker.runs += 1
+            with self.condition:
+                self.pending -= 1
+                if self.pending == 0:
+                    self.condition.notify_all()
+
+    def run(self, workers):
+        self.workers = [Worker() for _ in range(workers)]
+        self.error = None
+        threads = [threading.Thread(target=self.work, args=(worker,), daemon=True)
+                   for worker in self.workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            # drop whatever didn't get to run
+            self.injected.clear()
+            self.pending = 0
+            raise error
+
+
+scheduler = Scheduler()
+
+
+def go(callback, *args):
+    if callback:
+        scheduler.go(callback, args)
+
+
+def run(workers=None):
+    # runs until no callbacks are left, on `workers` threads
+    scheduler.run(workers or os.cpu_count() or 1)
+
+
+# Channel Methods
+
+def make(capacity=0):
+    return Channel(capacity)
+
+
+def len(channel):
+    return builtins.len(channel.buffer)
+
+
+def cap(channel):
+    return channel.capacity
+
+
+def try_send(channel, value, callback):
+    # completes the send if it can proceed without blocking, the caller
+    # must hold the channel's lock
+    # "A send on a closed channel proceeds by causing a run-time panic."
+    if channel.closed:
+        raise Exception("send on closed channel")
+
+    # "A send on an unbuffered channel can proceed if a receiver is ready."
+    receiver = channel.waiting_to_recv.dequeue()
+    if receiver is not None:
+        go(callback)
+        go(receiver.callback, value, True)
+        return True
+
+    # "A send on a buffered channel can proceed if there is room in the buffer."
+    if builtins.len(channel.buffer) < channel.capacity:
+        channel.buffer.append(value)
+        go(callback)
+        return True
+
+    return False
+
+
+def try_recv(channel, callback):
+    # completes the receive if it can proceed without blocking, the caller
+    # must hold the channel's lock
+    buffer = channel.buffer
+
+    # if there is a value in the buffer, receive it
+    if buffer:
+        value = buffer.popleft()
+        # the freed slot goes to the first blocked sender
+        sender = channel.waiting_to_send.dequeue()
+        if sender is not None:
+            buffer.append(sender.value)
+            go(sender.callback)
+        go(callback, value, True)
+        return True
+
+    # "if anything is currently blocked on sending for this channel, receive it"
+    sender = channel.waiting_to_send.dequeue()
+    if sender is not None:
+        go(sender.callback)
+        go(callback, sender.value, True)
+        return True
+
+    # "A receive operation on a closed channel can always proceed immediately,
+    # yielding the element type's zero value after any previously sent values have been received."
+    if channel.closed:
+        go(callback, None, False)
+        return True
+
+    return False
+
+
+def send(channel, value, callback):
+    # "A send on a nil channel blocks forever."
+    if channel is None:
+        return
+
+    with channel.lock:
+        if not try_send(channel, value, callback):
+            channel.send_queue().enqueue(Waiter(value, callback))
+
+
+def recv(channel, callback):
+    # "Receiving from a nil channel blocks forever."
+    if channel is None:
+        return
+
+    with channel.lock:
+        if not try_recv(channel, callback):
+            channel.recv_queue().enqueue(Waiter(None, callback))
+
+
+def close(channel):
+    with channel.lock:
+        # if the channel is already closed, we panic
+        if channel.closed:
+            raise Exception("close of closed channel")
+
+        channel.closed = True
+
+        # complete any senders, they will panic
+        sender = channel.waiting_to_send.dequeue()
+        while sender is not None:
+            go(send, channel, sender.value, sender.callback)
+            sender = channel.waiting_to_send.dequeue()
+
+        # and complete any receivers with the zero value
+        receiver = channel.waiting_to_recv.dequeue()
+        while receiver is not None:
+            go(receiver.callback, None, False)
+            receiver = channel.waiting_to_recv.dequeue()
+
+
+# Selection
+
+# used to indicate the default case in a select
+default = object()
+
+
+class Selection:
+    # the waiters a blocked select left on its channels, only the first one
+    # to be claimed fires and then the others are cancelled
+    __slots__ = ("lock", "fired", "waiters")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fired = None
+        self.waiters = []
+
+    def claim(self, waiter):
+        with self.lock:
+            if self.fired is not None:
+                return False
+            self.fired = waiter
+        # the claiming goroutine holds the lock of the winner's channel, so
+        # the others are cancelled later, one channel lock at a time
+        go(self.cancel)
+        return True
+
+    def cancel(self):
+        for channel, queue, waiter in self.waiters:
+            if waiter is not self.fired:
+                with channel.lock:
+                    queue.cancel(waiter)
+
+
+def select(cases, callback=None):
+    default_case = None
+    ready = []
+    for case in cases:
+        if case[0] is default:
+            default_case = case
+        elif case[1] is not None:
+            ready.append(case)
+
+    def wrap_send(case):
+        def onsend():
+            case[3]()
+            go(callback)
+        return onsend
+
+    def wrap_recv(case):
+        def onrecv(value, ok):
+            case[2](value, ok)
+            go(callback)
+        return onrecv
+
+    # lock every channel involved, always in the same order so two selects
+    # can't deadlock each other, and try the cases in a random order
+    channels = sorted({id(case[1]): case[1] for case in ready}.values(), key=id)
+    shuffle(ready)
+
+    for channel in channels:
+        channel.lock.acquire()
+    try:
+        # first see if any of the cases are ready to proceed
+        for case in ready:
+            if case[0] is send:
+                if try_send(case[1], case[2], wrap_send(case)):
+                    return
+            elif try_recv(case[1], wrap_recv(case)):
+                return
+
+        if default_case is not None:
+            # the default case continues with the callback like the others,
+            # so it has finished by the time the callback runs
+            def ondefault():
+                default_case[1]()
+                go(callback)
+            go(ondefault)
+            return
+
+        # if not, enqueue each case into the waiting queues, and if there
+        # are none "a select with no cases (or only nil channels) blocks
+        # forever"
+        selection = Selection()
+        for case in ready:
+            if case[0] is send:
+                queue = case[1].send_queue()
+                waiter = Waiter(case[2], wrap_send(case), selection, case)
+            else:
+                queue = case[1].recv_queue()
+                waiter = Waiter(None, wrap_recv(case), selection, case)
+            queue.enqueue(waiter)
+            selection.waiters.append((case[1], queue, waiter))
+    finally:
+        for channel in channels:
+            channel.lock.release()
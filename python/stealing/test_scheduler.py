@@ -0,0 +1,136 @@
+from collections import deque
+import threading
+import time
+from . import close, default, go, make, recv, run, scheduler, select, send
+
+
+def test_spawn_tree_runs_on_every_worker():
+    results = []
+    threads = set()
+    lock = threading.Lock()
+
+    def spawn(depth):
+        with lock:
+            threads.add(threading.get_ident())
+        if depth == 0:
+            # work that releases the GIL, so the other workers get to run
+            time.sleep(0.001)
+            with lock:
+                results.append(1)
+            return
+        go(spawn, depth - 1)
+        go(spawn, depth - 1)
+
+    go(spawn, 6)
+    run(4)
+    assert len(results) == 2 ** 6
+    # the other workers stole from the one the tree started on
+    assert sum(worker.steals for worker in scheduler.workers) > 0
+    assert sum(worker.runs for worker in scheduler.workers) == 2 ** 7 - 1
+
+
+def test_callbacks_are_counted_before_they_can_be_stolen():
+    counted = []
+
+    class Tasks(deque):
+        def append(self, task):
+            counted.append(scheduler.pending)
+            super().append(task)
+
+    def spawn():
+        scheduler.local.worker.tasks = Tasks()
+        go(lambda: None)
+
+    go(spawn)
+    run(1)
+    # spawn and the callback it started
+    assert counted == [2]
+
+
+def test_channels():
+    ch = make()
+    buffered = make(4)
+    results = []
+    lock = threading.Lock()
+
+    def produce(src, n):
+        def step(i):
+            if i < n:
+                send(src, i, lambda: step(i + 1))
+            else:
+                close(src)
+        step(0)
+
+    def consume(src):
+        def onrecv(value, ok):
+            if ok:
+                with lock:
+                    results.append(value)
+                recv(src, onrecv)
+        recv(src, onrecv)
+
+    for src in (ch, buffered):
+        go(produce, src, 1000)
+        go(consume, src)
+        go(consume, src)
+    run(4)
+    assert sorted(results) == sorted(list(range(1000)) * 2)
+
+
+def test_select():
+    a, b = make(), make()
+    results = []
+    lock = threading.Lock()
+
+    def loop(n):
+        if n == 0:
+            return
+
+        def onrecv(value, ok):
+            with lock:
+                results.append(value)
+
+        select([(recv, a, onrecv), (recv, b, onrecv)], lambda: loop(n - 1))
+
+    go(loop, 200)
+    for i in range(100):
+        go(send, a, i, None)
+        go(send, b, -i, None)
+    run(4)
+    assert sorted(results) == sorted(list(range(100)) + [-i for i in range(100)])
+    # the losing cases were cancelled
+    assert all(w.live is False for w in a.waiting_to_recv.waiters)
+
+    picked = []
+    select([(recv, make(), None), (default, lambda: picked.append(True))])
+    run(2)
+    assert picked == [True]
+
+
+def test_select_default_runs_before_callback():
+    for workers in (1, 4):
+        order = []
+        select([(recv, make(), None), (default, lambda: order.append("default"))],
+               lambda: order.append("after"))
+        run(workers)
+        assert order == ["default", "after"]
+
+
+def test_errors_stop_the_run():
+    def boom():
+        raise ValueError("boom")
+
+    for _ in range(100):
+        go(lambda: None)
+    go(boom)
+    try:
+        run(4)
+    except ValueError:
+        pass
+    else:
+        assert False, "expected the callback's error"
+    # the scheduler can be used again
+    results = []
+    go(results.append, 1)
+    run(2)
+    assert results == [1]
@@ -0,0 +1,386 @@
+from collections import deque
+from random import shuffle
+import builtins
+import threading
+
+
+class Waiter:
+    # a goroutine parked on a channel, it sleeps on the `parked` lock until
+    # another goroutine stores the result and releases it
+    __slots__ = ("value", "ok", "live", "selection", "case", "parked")
+
+    def __init__(self, value=None, selection=None, case=None):
+        self.value = value
+        self.ok = False
+        self.live = True
+        # set when the waiter is one of the cases of a blocked select
+        self.selection = selection
+        self.case = case
+        if selection is None:
+            self.parked = threading.Lock()
+            self.parked.acquire()
+        else:
+            self.parked = selection.parked
+
+    def wait(self):
+        self.parked.acquire()
+
+    def wake(self):
+        self.parked.release()
+
+
+class WaitingQueue:
+    # once more than this many cancelled waiters are left in the deque (and
+    # they outnumber the rest) it is rebuilt without them
+    compact_threshold = 64
+
+    __slots__ = ("waiters", "dead")
+
+    def __init__(self):
+        self.waiters = deque()
+        self.dead = 0
+
+    def enqueue(self, waiter):
+        self.waiters.append(waiter)
+
+    def dequeue(self):
+        # returns the first waiter that can still be woken, or None. Waiters
+        # of a select are only handed out once, to whoever claims it first.
+        waiters = self.waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.live:
+                self.dead -= 1
+                continue
+            waiter.live = False
+            if waiter.selection is None or waiter.selection.claim(waiter):
+                return waiter
+        return None
+
+    def cancel(self, waiter):
+        if not waiter.live:
+            return
+        waiter.live = False
+        self.dead += 1
+        if self.dead > self.compact_threshold and self.dead > builtins.len(self.waiters) - self.dead:
+            self.waiters = deque(w for w in self.waiters if w.live)
+            self.dead = 0
+
+
+class NoWaiters:
+    # Stands in for a channel's WaitingQueue until a goroutine parks on it.
+    # Plenty of channels never have anything parked on one side of them, or
+    # on either, and so never need the queue and its deque.
+    __slots__ = ()
+
+    waiters = ()
+
+    def dequeue(self):
+        return None
+
+
+no_waiters = NoWaiters()
+
+
+class RingBuffer:
+    # fixed capacity FIFO, slots are preallocated so pushing and popping
+    # never allocates
+    __slots__ = ("slots", "head", "size")
+
+    def __init__(self, capacity):
+        self.slots = [None] * capacity
+        self.head = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, x):
+        slots = self.slots
+        i = self.head + self.size
+        if i >= builtins.len(slots):
+            i -= builtins.len(slots)
+        slots[i] = x
+        self.size += 1
+
+    def pop(self):
+        slots = self.slots
+        head = self.head
+        x = slots[head]
+        # drop the reference so the value can be collected
+        slots[head] = None
+        head += 1
+        if head == builtins.len(slots):
+            head = 0
+        self.head = head
+        self.size -= 1
+        return x
+
+
+# unbuffered channels never push to their buffer, so they all share this one
+unbuffered = RingBuffer(0)
+
+
+class Channel:
+    __slots__ = ("capacity", "buffer", "closed", "waiting_to_send", "waiting_to_recv", "lock")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = RingBuffer(capacity) if capacity else unbuffered
+        self.closed = False
+        # see send_queue and recv_queue
+        self.waiting_to_send = no_waiters
+        self.waiting_to_recv = no_waiters
+        # guards everything above
+        self.lock = threading.Lock()
+
+    def send_queue(self):
+        # the queue of blocked senders, made when the first one parks. The
+        # caller holds the lock.
+        if self.waiting_to_send is no_waiters:
+            self.waiting_to_send = WaitingQueue()
+        return self.waiting_to_send
+
+    def recv_queue(self):
+        if self.waiting_to_recv is no_waiters:
+            self.waiting_to_recv = WaitingQueue()
+        return self.waiting_to_recv
+
+
+# Scheduling Methods
+
+def go(callback, *args):
+    # goroutines are OS threads, so callbacks that release the GIL really
+    # do run in parallel
+    thread = threading.Thread(target=callback, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def block_forever():
+    threading.Event().wait()
+
+
+# Channel Methods
+
+def make(capacity=0):
+    return Channel(capacity)
+
+
+def len(channel):
+    return channel.buffer.size
+
+
+def cap(channel):
+    return channel.capacity
+
+
+def try_send(channel, value):
+    # completes the send if it can proceed without blocking, the caller
+    # must hold the channel's lock
+    # "A send on a closed channel proceeds by causing a run-time panic."
+    if channel.closed:
+        raise Exception("send on closed channel")
+
+    # "A send on an unbuffered channel can proceed if a receiver is ready."
+    receiver = channel.waiting_to_recv.dequeue()
+    if receiver is not None:
+        receiver.value = value
+        receiver.ok = True
+        receiver.wake()
+        return True
+
+    # "A send on a buffered channel can proceed if there is room in the buffer."
+    if channel.buffer.size < channel.capacity:
+        channel.buffer.push(value)
+        return True
+
+    return False
+
+
+def try_recv(channel):
+    # completes the receive if it can proceed without blocking, returning
+    # (value, ok) or None. The caller must hold the channel's lock.
+    buffer = channel.buffer
+
+    # if there is a value in the buffer, receive it
+    if buffer.size:
+        value = buffer.pop()
+        # the freed slot goes to the first blocked sender
+        sender = channel.waiting_to_send.dequeue()
+        if sender is not None:
+            buffer.push(sender.value)
+            sender.ok = True
+            sender.wake()
+        return value, True
+
+    # "if anything is currently blocked on sending for this channel, receive it"
+    sender = channel.waiting_to_send.dequeue()
+    if sender is not None:
+        sender.ok = True
+        sender.wake()
+        return sender.value, True
+
+    # "A receive operation on a closed channel can always proceed immediately,
+    # yielding the element type's zero value after any previously sent values have been received."
+    if channel.closed:
+        return None, False
+
+    return None
+
+
+def send(channel, value):
+    # "A send on a nil channel blocks forever."
+    if channel is None:
+        block_forever()
+
+    with channel.lock:
+        if try_send(channel, value):
+            return
+        waiter = Waiter(value)
+        channel.send_queue().enqueue(waiter)
+
+    waiter.wait()
+    if not waiter.ok:
+        raise Exception("send on closed channel")
+
+
+def recv(channel):
+    # "Receiving from a nil channel blocks forever."
+    if channel is None:
+        block_forever()
+
+    with channel.lock:
+        result = try_recv(channel)
+        if result is not None:
+            return result
+        waiter = Waiter()
+        channel.recv_queue().enqueue(waiter)
+
+    waiter.wait()
+    return waiter.value, waiter.ok
+
+
+def close(channel):
+    with channel.lock:
+        # if the channel is already closed, we panic
+        if channel.closed:
+            raise Exception("close of closed channel")
+
+        channel.closed = True
+
+        # complete any senders, they will panic
+        # and complete any receivers with the zero value
+        for queue in (channel.waiting_to_send, channel.waiting_to_recv):
+            waiter = queue.dequeue()
+            while waiter is not None:
+                waiter.value, waiter.ok = None, False
+                waiter.wake()
+                waiter = queue.dequeue()
+
+
+# Selection
+
+# used to indicate the default case in a select
+default = object()
+
+
+class Selection:
+    # the waiters a blocked select left on its channels, they share one
+    # parked lock and only the first one to be claimed fires
+    __slots__ = ("lock", "parked", "fired", "waiters")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.parked = threading.Lock()
+        self.parked.acquire()
+        self.fired = None
+        self.waiters = []
+
+    def claim(self, waiter):
+        with self.lock:
+            if self.fired is not None:
+                return False
+            self.fired = waiter
+            return True
+
+
+def select(cases):
+    default_case = None
+    ready = []
+    for case in cases:
+        if case[0] is default:
+            default_case = case
+        elif case[1] is not None:
+            ready.append(case)
+
+    # lock every channel involved, always in the same order so two selects
+    # can't deadlock each other, and try the cases in a random order
+    channels = sorted({id(case[1]): case[1] for case in ready}.values(), key=id)
+    shuffle(ready)
+
+    chosen = None
+    selection = None
+    for channel in channels:
+        channel.lock.acquire()
+    try:
+        # first see if any of the cases are ready to proceed
+        for case in ready:
+            if case[0] is send:
+                if try_send(case[1], case[2]):
+                    chosen, received = case, None
+                    break
+            else:
+                received = try_recv(case[1])
+                if received is not None:
+                    chosen = case
+                    break
+
+        # if not, and there's no default case, enqueue each case into the
+        # waiting queues
+        if chosen is None and default_case is None:
+            selection = Selection()
+            for case in ready:
+                if case[0] is send:
+                    queue = case[1].send_queue()
+                    waiter = Waiter(case[2], selection, case)
+                else:
+                    queue = case[1].recv_queue()
+                    waiter = Waiter(None, selection, case)
+                queue.enqueue(waiter)
+                selection.waiters.append((case[1], queue, waiter))
+    finally:
+        for channel in channels:
+            channel.lock.release()
+
+    if chosen is not None:
+        if chosen[0] is send:
+            chosen[3]()
+        else:
+            chosen[2](*received)
+        return
+
+    if selection is None:
+        default_case[1]()
+        return
+
+    # "a select with no cases (or only nil channels) blocks forever"
+    if not selection.waiters:
+        block_forever()
+
+    selection.parked.acquire()
+    fired = selection.fired
+
+    # remove the others
+    for channel, queue, waiter in selection.waiters:
+        if waiter is not fired:
+            with channel.lock:
+                queue.cancel(waiter)
+
+    case = fired.case
+    if case[0] is send:
+        if not fired.ok:
+            raise Exception("send on closed channel")
+        case[3]()
+    else:
+        case[2](fired.value, fired.ok)
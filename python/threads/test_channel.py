@@ -0,0 +1,71 @@
+import hashlib
+from . import close, go, len, cap, make, recv, send
+
+
+def test_ping_pong():
+    ping, pong, done = make(), make(), make()
+
+    def player(src, dst):
+        while True:
+            value, _ = recv(src)
+            if value == 1000:
+                send(done, value)
+                return
+            send(dst, value + 1)
+
+    go(player, ping, pong)
+    go(player, pong, ping)
+    send(ping, 0)
+    assert recv(done) == (1000, True)
+
+
+def test_buffering():
+    ch = make(3)
+    send(ch, 1)
+    send(ch, 2)
+    assert len(ch) == 2 and cap(ch) == 3
+    assert recv(ch) == (1, True)
+    close(ch)
+    assert recv(ch) == (2, True)
+    assert recv(ch) == (None, False)
+
+
+def test_close_wakes_receivers():
+    ch, done = make(), make(4)
+    for _ in range(4):
+        go(lambda: send(done, recv(ch)))
+    close(ch)
+    assert [recv(done)[0] for _ in range(4)] == [(None, False)] * 4
+
+
+def test_parallel_workers():
+    jobs, results = make(16), make(16)
+
+    def worker():
+        while True:
+            data, ok = recv(jobs)
+            if not ok:
+                send(results, None)
+                return
+            # hashlib releases the GIL for large inputs
+            send(results, hashlib.sha256(data).hexdigest())
+
+    workers = 4
+    for _ in range(workers):
+        go(worker)
+
+    def producer():
+        for i in range(64):
+            send(jobs, bytes([i]) * 100000)
+        close(jobs)
+    go(producer)
+
+    digests, finished = [], 0
+    while finished < workers:
+        value, _ = recv(results)
+        if value is None:
+            finished += 1
+        else:
+            digests.append(value)
+    assert sorted(digests) == sorted(
+        hashlib.sha256(bytes([i]) * 100000).hexdigest() for i in range(64))
@@ -0,0 +1,62 @@
+from . import default, select, send, make, close, recv, go
+
+
+def fanin(dst, src1, src2):
+    open_ = {src1, src2}
+
+    def onrecv(src):
+        def f(value, ok):
+            if ok:
+                send(dst, value)
+            else:
+                open_.discard(src)
+        return f
+
+    while open_:
+        select([(recv, src, onrecv(src)) for src in list(open_)])
+    close(dst)
+
+
+def sendall(dst, xs):
+    for x in xs:
+        send(dst, x)
+    close(dst)
+
+
+def recvall(src):
+    values = []
+    while True:
+        value, ok = recv(src)
+        if not ok:
+            return values
+        values.append(value)
+
+
+def test_select():
+    c1, c2, c3 = make(), make(), make()
+    go(sendall, c2, list(range(0, 500)))
+    go(sendall, c3, list(range(500, 1000)))
+    go(fanin, c1, c2, c3)
+    assert sorted(recvall(c1)) == list(range(1000))
+
+
+def test_select_send():
+    c1, c2, done = make(), make(), make(1)
+    sent = []
+    go(lambda: send(done, recv(c2)))
+    select([
+        (send, c1, 1, lambda: sent.append("c1")),
+        (send, c2, 2, lambda: sent.append("c2")),
+    ])
+    assert sent == ["c2"]
+    assert recv(done) == ((2, True), True)
+    assert not any(w.live for w in c1.waiting_to_send.waiters)
+
+
+def test_select_default():
+    results = []
+    select([
+        (recv, make(), lambda value, ok: results.append(value)),
+        (default, lambda: results.append("default")),
+    ])
+    assert results == ["default"]
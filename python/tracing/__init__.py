@@ -0,0 +1,138 @@
+"""
+An event recorder for the v2 and v3 runtimes.
+
+Tracing is off until a runtime's start_trace() is called, until then every
+traced operation only pays for one `tracer is not None` check. Events go
+into a preallocated ring buffer, so a long run keeps its most recent
+`capacity` events, and export() writes them in the Chrome trace event
+format for chrome://tracing or https://ui.perfetto.dev.
+
+Each event is (time, kind, goroutine, channel, arg), with time from
+time.perf_counter_ns and kind one of:
+
+    go      goroutine started, arg is what was started
+    park    a goroutine blocked on channel, arg is (op, waiter)
+    unpark  the waiter was woken up or cancelled, arg is the waiter
+    send    a send on channel started, arg is the channel's length
+    recv    a receive on channel started, arg is the channel's length
+    close   channel was closed
+    select  a select chose the case on channel, arg is the case's index
+"""
+from array import array
+import itertools
+import json
+import time
+
+CAPACITY = 1 << 16
+
+clock = time.perf_counter_ns
+
+
+class Tracer:
+    def __init__(self, capacity=CAPACITY):
+        # round up to a power of two so the slot is a mask away
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.mask = size - 1
+        self.times = array("q", bytes(8 * size))
+        self.kinds = [None] * size
+        self.goroutines = [None] * size
+        self.channels = [None] * size
+        self.args = [None] * size
+        # events recorded so far, including overwritten ones
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.mask + 1)
+
+    @property
+    def dropped(self):
+        # events that were overwritten by newer ones
+        return self.count - len(self)
+
+    def record(self, kind, goroutine, channel, arg=None):
+        i = self.count & self.mask
+        self.times[i] = clock()
+        self.kinds[i] = kind
+        self.goroutines[i] = goroutine
+        self.channels[i] = channel
+        self.args[i] = arg
+        self.count += 1
+
+    def events(self):
+        # the recorded events, oldest first
+        for n in range(self.count - len(self), self.count):
+            i = n & self.mask
+            yield self.times[i], self.kinds[i], self.goroutines[i], self.channels[i], self.args[i]
+
+
+def name(x):
+    coro = getattr(x, "get_coro", None)
+    if coro is not None:
+        x = coro()
+    return getattr(x, "__qualname__", None) or repr(x)
+
+
+def chrome_trace(tracer):
+    # Goroutines get a thread each (v2 callbacks all share one), time spent
+    # parked shows up as async spans and every channel gets a counter of
+    # its length.
+    events = []
+    threads = {}
+    channels = {}
+    spans = {}
+    ids = itertools.count(1)
+    start = None
+
+    def thread(goroutine):
+        if goroutine not in threads:
+            threads[goroutine] = len(threads) + 1
+            events.append({"ph": "M", "name": "thread_name", "pid": 1, "tid": threads[goroutine],
+                           "args": {"name": "scheduler" if goroutine is None else name(goroutine)}})
+        return threads[goroutine]
+
+    def channel_name(channel):
+        if channel is None:
+            return "nil channel"
+        if channel not in channels:
+            channels[channel] = f"channel {len(channels) + 1}"
+        return channels[channel]
+
+    for t, kind, goroutine, channel, arg in tracer.events():
+        if start is None:
+            start = t
+        event = {"ph": "i", "s": "t", "name": kind, "pid": 1, "tid": thread(goroutine),
+                 "ts": (t - start) / 1000}
+        if kind == "go":
+            event["args"] = {"goroutine": name(arg)}
+        elif kind == "park":
+            op, waiter = arg
+            spans[waiter] = span = (next(ids), f"{op} on {channel_name(channel)}")
+            event.update(ph="b", cat="blocked", id=span[0], name=span[1])
+            del event["s"]
+        elif kind == "unpark":
+            span = spans.pop(arg, None)
+            if span is None:
+                # parked before the oldest event we still have
+                continue
+            event.update(ph="e", cat="blocked", id=span[0], name=span[1])
+            del event["s"]
+        elif kind in ("send", "recv"):
+            event["args"] = {"channel": channel_name(channel), "len": arg}
+            events.append(event)
+            event = {"ph": "C", "name": channel_name(channel), "pid": 1, "ts": event["ts"],
+                     "args": {"len": arg}}
+        elif kind == "close":
+            event["args"] = {"channel": channel_name(channel)}
+        elif kind == "select":
+            event["args"] = {"channel": channel_name(channel), "case": arg}
+        events.append(event)
+
+    return {"traceEvents": events, "displayTimeUnit": "ns",
+            "otherData": {"dropped": tracer.dropped}}
+
+
+def export(tracer, path):
+    with open(path, "w") as f:
+        json.dump(chrome_trace(tracer), f)
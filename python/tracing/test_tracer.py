@@ -0,0 +1,64 @@
+import asyncio
+import json
+import v2
+import v3
+from . import Tracer, chrome_trace, export
+
+
+def test_ring_keeps_the_latest_events():
+    tracer = Tracer(3)
+    assert tracer.mask == 3
+    for i in range(10):
+        tracer.record("send", None, None, i)
+    assert len(tracer) == 4
+    assert tracer.dropped == 6
+    assert [arg for _, _, _, _, arg in tracer.events()] == [6, 7, 8, 9]
+
+
+def test_trace_v2(tmp_path):
+    tracer = v2.start_trace()
+    try:
+        ch = v2.make()
+        v2.go(lambda: v2.recv(ch, lambda value, ok: None))
+        v2.go(lambda: v2.send(ch, 1, None))
+        v2.run()
+    finally:
+        assert v2.stop_trace() is tracer
+    assert v2.tracer is None
+
+    kinds = [kind for _, kind, _, _, _ in tracer.events()]
+    assert kinds.count("go") == 2
+    assert kinds.index("park") < kinds.index("send") < kinds.index("unpark")
+
+    path = tmp_path / "trace.json"
+    export(tracer, path)
+    events = json.loads(path.read_text())["traceEvents"]
+    begin, = [e for e in events if e["ph"] == "b"]
+    end, = [e for e in events if e["ph"] == "e"]
+    assert begin["id"] == end["id"] and begin["name"] == "recv on channel 1"
+    assert {e["name"] for e in events if e["ph"] == "C"} == {"channel 1"}
+
+
+def test_trace_v3():
+    async def worker(ch):
+        await v3.send(ch, 1)
+        v3.close(ch)
+
+    async def main():
+        ch = v3.make()
+        v3.go(worker(ch))
+        values = []
+        async for value in ch:
+            values.append(value)
+        return values
+
+    tracer = v3.start_trace()
+    try:
+        assert asyncio.run(main()) == [1]
+    finally:
+        v3.stop_trace()
+
+    trace = chrome_trace(tracer)
+    threads = {e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+    assert threads == {"test_trace_v3.<locals>.main", "test_trace_v3.<locals>.worker"}
+    assert any(e["name"] == "close" for e in trace["traceEvents"])
@@ -1,53 +1,178 @@
+from collections import deque
 from random import randint
 import builtins
 
 
-class WaitingQueue(list):
-    total = 0
+class Waiter:
+    __slots__ = ("item", "live")
 
-    def enqueue(self, x):
-        WaitingQueue.total += 1
-        self.append(x)
+    def __init__(self, item):
+        self.item = item
+        self.live = True
 
-    def dequeue(self, x=None):
-        if x is None:
-            x = self.pop(0)
-            WaitingQueue.total -= 1
-        else:
-            # attempt to remove the passed in item from the queue
-            idx = self.index(x)
-            if idx is not None:
-                self.pop(idx)
-                WaitingQueue.total -= 1
-        return x
+
+class WaitingQueue:
+    # once more than this many cancelled waiters are left in the deque (and
+    # they outnumber the live ones) it is rebuilt without them
+    compact_threshold = 64
+
+    __slots__ = ("waiters", "live", "dead", "blocked")
+
+    def __init__(self, channel, op):
+        self.waiters = deque()
+        self.live = 0
+        self.dead = 0
+        # what the waiters are blocked on, for deadlock reports
+        self.blocked = (op, channel)
+
+    def __len__(self):
+        return self.live
+
+    def enqueue(self, x):
+        waiter = Waiter(x)
+        self.waiters.append(waiter)
+        self.live += 1
+        scheduler.parked[waiter] = self.blocked
+        return waiter
+
+    def dequeue(self):
+        # cancelled waiters are skipped lazily
+        popleft = self.waiters.popleft
+        waiter = popleft()
+        while not waiter.live:
+            self.dead -= 1
+            waiter = popleft()
+        waiter.live = False
+        self.live -= 1
+        scheduler.parked.pop(waiter, None)
+        return waiter.item
+
+    def cancel(self, waiter):
+        # attempt to remove the waiter from the queue, returning None if it
+        # was already dequeued or cancelled
+        if not waiter.live:
+            return None
+        waiter.live = False
+        self.live -= 1
+        self.dead += 1
+        scheduler.parked.pop(waiter, None)
+        if self.dead > self.compact_threshold and self.dead > self.live:
+            self.waiters = deque(w for w in self.waiters if w.live)
+            self.dead = 0
+        return waiter.item
+
+
+class NoWaiters:
+    # Stands in for a channel's WaitingQueue until a goroutine parks on it.
+    # Plenty of channels never have anything parked on one side of them, or
+    # on either, and so never need the queue and its deque.
+    __slots__ = ()
+
+    waiters = ()
+
+    def __len__(self):
+        return 0
+
+
+no_waiters = NoWaiters()
+
+
+class Deadlock(Exception):
+    def __init__(self, blocked):
+        # what every goroutine was blocked on, as (op, channel, goroutine)
+        self.blocked = blocked
+        lines = ["fatal error: all goroutines are asleep - deadlock"]
+        for op, channel, goroutine in blocked:
+            name = getattr(goroutine, "__qualname__", None) or repr(goroutine)
+            on = "nil channel" if channel is None else repr(channel)
+            lines.append(f"goroutine {name} [{op} on {on}]")
+        super().__init__("\n".join(lines))
 
 
 class Channel:
+    __slots__ = ("closed", "waiting_to_send", "waiting_to_recv")
+
     def __init__(self):
         self.closed = False
-        self.waiting_to_send = WaitingQueue()
-        self.waiting_to_recv = WaitingQueue()
+        # see send_queue and recv_queue
+        self.waiting_to_send = no_waiters
+        self.waiting_to_recv = no_waiters
+
+    def send_queue(self):
+        # the queue of blocked senders, made when the first one parks
+        if self.waiting_to_send is no_waiters:
+            self.waiting_to_send = WaitingQueue(self, "send")
+        return self.waiting_to_send
+
+    def recv_queue(self):
+        if self.waiting_to_recv is no_waiters:
+            self.waiting_to_recv = WaitingQueue(self, "recv")
+        return self.waiting_to_recv
 
 
 # Scheduling Methods
 
-execution_queue = []
+class Scheduler:
+    # how many callbacks run between checks of the run queue
+    batch_size = 256
+
+    def __init__(self):
+        self.queue = deque()
+        # every waiter that's blocked, and what it's blocked on
+        self.parked = {}
+        self.steps = 0
+        self.batches = 0
+
+    def go(self, callback):
+        if callback:
+            self.queue.append(callback)
+
+    def run(self):
+        queue = self.queue
+        popleft = queue.popleft
+        batch_size = self.batch_size
+        steps = 0
+        try:
+            while queue:
+                n = builtins.len(queue)
+                if n > batch_size:
+                    n = batch_size
+                self.batches += 1
+                for _ in range(n):
+                    popleft()()
+                steps += n
+        except BaseException:
+            # the failed run's goroutines are gone, so they can't be
+            # reported as deadlocked by the next one
+            self.parked.clear()
+            queue.clear()
+            raise
+        finally:
+            self.steps += steps
+
+        if self.parked:
+            blocked = self.blocked()
+            # like the rest of a Go program, the blocked goroutines are gone
+            self.parked.clear()
+            raise Deadlock(blocked)
+
+    def blocked(self):
+        blocked = []
+        for waiter, (op, channel) in self.parked.items():
+            goroutine = waiter.item[1] if op == "send" else waiter.item
+            blocked.append((op, channel, goroutine))
+        return blocked
+
+
+scheduler = Scheduler()
 
 
 def go(callback):
-    if callback:
-        execution_queue.append(callback)
+    scheduler.go(callback)
 
 
 def run():
-    WaitingQueue.total = 0
-
-    while execution_queue:
-        f = execution_queue.pop(0)
-        f()
-
-    if WaitingQueue.total > 0:
-        raise Exception("fatal error: all goroutines are asleep - deadlock")
+    scheduler.run()
 
 
 # Channel Methods
@@ -67,7 +192,7 @@ def cap(channel):
 def send(channel, value, callback):
     # "A send on a nil channel blocks forever."
     if channel is None:
-        WaitingQueue.total += 1
+        scheduler.parked[Waiter((value, callback))] = ("send", None)
         return
 
     # "A send on a closed channel proceeds by causing a run-time panic."
@@ -81,13 +206,13 @@ def send(channel, value, callback):
         go(lambda: receiver(value, True))
         return
 
-    channel.waiting_to_send.enqueue((value, callback))
+    channel.send_queue().enqueue((value, callback))
 
 
 def recv(channel, callback):
     # "Receiving from a nil channel blocks forever."
     if channel is None:
-        WaitingQueue.total += 1
+        scheduler.parked[Waiter(callback)] = ("recv", None)
         return
 
     # "if anything is currently blocked on sending for this channel, receive it"
@@ -103,7 +228,7 @@ def recv(channel, callback):
         go(lambda: callback(None, False))
         return
 
-    channel.waiting_to_recv.enqueue(callback)
+    channel.recv_queue().enqueue(callback)
 
 
 def close(channel):
@@ -124,6 +249,50 @@ def close(channel):
         recv(channel, callback)
 
 
+# Batch Methods
+
+def send_many(channel, values, callback):
+    values = iter(values)
+
+    def proceed():
+        for value in values:
+            # hand values straight to any receivers that are ready
+            if channel is not None and not channel.closed and channel.waiting_to_recv:
+                receiver = channel.waiting_to_recv.dequeue()
+                go(lambda receiver=receiver, value=value: receiver(value, True))
+            else:
+                # block (or panic) on this one and carry on once it's sent
+                send(channel, value, proceed)
+                return
+        go(callback)
+
+    proceed()
+
+
+def recv_many(channel, max_n, callback):
+    def take(values):
+        # receive from blocked senders without waiting
+        while builtins.len(values) < max_n and channel.waiting_to_send:
+            value, sender = channel.waiting_to_send.dequeue()
+            values.append(value)
+            go(sender)
+        return values
+
+    def onrecv(value, ok):
+        if ok:
+            callback(take([value]), True)
+        else:
+            callback([], False)
+
+    if channel is not None:
+        values = take([])
+        if values:
+            go(lambda: callback(values, True))
+            return
+
+    recv(channel, onrecv)
+
+
 # Selection
 
 # used to indicate the default case in a select
@@ -162,25 +331,24 @@ def select(cases, callback=None):
     # we also update each callback so it will cleanup all the
     # other cases so only one is fired
 
-    wrapped = []
+    waiters = []
 
     def cleanup():
-        for case in wrapped:
-            if case[0] == send:
-                case[1].waiting_to_send.dequeue((case[2], case[3]))
-            elif case[0] == recv:
-                case[1].waiting_to_recv.dequeue(case[2])
+        for queue, waiter in waiters:
+            queue.cancel(waiter)
         go(callback)
 
+    def wrap_send(case):
+        return lambda: (cleanup(), case[3]())
+
+    def wrap_recv(case):
+        return lambda value, ok: (cleanup(), case[2](value, ok))
+
     # overwrite all the callbacks and enqueue into the waiting queues
     for case in cases:
         if case[0] == send:
-            new_case = (case[0], case[1], case[2],
-                        lambda: (cleanup(), case[3]()))
-            case[1].waiting_to_send.enqueue((new_case[2], new_case[3]))
-            wrapped.append(new_case)
+            queue = case[1].send_queue()
+            waiters.append((queue, queue.enqueue((case[2], wrap_send(case)))))
         elif case[0] == recv:
-            new_case = (case[0], case[1],
-                        lambda value, ok: (cleanup(), case[2](value, ok)))
-            case[1].waiting_to_recv.enqueue(new_case[2])
-            wrapped.append(new_case)
+            queue = case[1].recv_queue()
+            waiters.append((queue, queue.enqueue(wrap_recv(case))))
@@ -1,4 +1,4 @@
-from . import go, make, run, send
+from . import Deadlock, WaitingQueue, Scheduler, close, go, make, recv, recv_many, run, send, send_many
 
 
 def test_send_on_nil_channel():
@@ -10,3 +10,100 @@ def test_send_on_nil_channel():
     except:
         raised = True
     assert raised
+
+
+def test_waiting_queue_cancel():
+    queue = WaitingQueue(make(), "recv")
+    a, b, c = queue.enqueue(1), queue.enqueue(2), queue.enqueue(3)
+    assert queue.cancel(b) == 2
+    assert queue.cancel(b) is None
+    assert len(queue) == 2
+    assert queue.dequeue() == 1
+    assert queue.dequeue() == 3
+    assert not queue
+    assert queue.cancel(a) is None
+
+
+def test_waiting_queue_compacts_cancelled_waiters():
+    queue = WaitingQueue(make(), "recv")
+    waiters = [queue.enqueue(i) for i in range(1000)]
+    for waiter in waiters[:-1]:
+        queue.cancel(waiter)
+    assert len(queue) == 1
+    assert len(queue.waiters) <= WaitingQueue.compact_threshold + 1
+    assert queue.dequeue() == 999
+
+
+def test_scheduler_runs_in_batches():
+    results = []
+
+    def spawn(i):
+        results.append(i)
+        if i < 999:
+            s.go(lambda: spawn(i + 1))
+
+    s = Scheduler()
+    s.batch_size = 10
+    for i in range(0, 1000, 100):
+        s.go(lambda i=i: results.append(-i))
+    s.go(lambda: spawn(0))
+    s.run()
+    assert results[:10] == [-i for i in range(0, 1000, 100)]
+    assert results[10:] == list(range(1000))
+    assert s.steps == 1010
+    assert s.batches == 1 + 1000
+
+
+def test_send_many_recv_many():
+    batches = []
+
+    def onrecv(values, ok):
+        batches.append((values, ok))
+        if ok:
+            recv_many(ch, 3, onrecv)
+
+    ch = make()
+    go(lambda: send_many(ch, range(5), lambda: close(ch)))
+    go(lambda: recv_many(ch, 3, onrecv))
+    run()
+    assert [x for values, ok in batches for x in values] == [0, 1, 2, 3, 4]
+    assert batches[-1] == ([], False)
+
+
+def test_deadlock_report():
+    ch = make()
+
+    def forgotten_receiver():
+        recv(ch, lambda value, ok: None)
+
+    go(forgotten_receiver)
+    go(lambda: send(None, 1, None))
+    try:
+        run()
+    except Deadlock as e:
+        assert [(op, channel) for op, channel, _ in e.blocked] == [("recv", ch), ("send", None)]
+        assert "forgotten_receiver" in str(e)
+    else:
+        assert False, "expected a deadlock"
+    # the next run starts from a clean slate
+    go(lambda: None)
+    run()
+
+
+def test_failed_run_leaves_nothing_behind():
+    ch = make()
+    recv(ch, lambda value, ok: None)
+    go(lambda: 1 / 0)
+    go(lambda: None)
+    try:
+        run()
+    except ZeroDivisionError:
+        pass
+    else:
+        assert False, "expected the callback's error"
+    # neither the parked recv nor the callbacks that didn't get to run
+    # belong to the next run
+    ran = []
+    go(lambda: ran.append(True))
+    run()
+    assert ran == [True]
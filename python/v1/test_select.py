@@ -58,3 +58,16 @@ def test_select():
     go(lambda: fanin(c1, c2, c3))
     go(lambda: recvall(c1, callback))
     run()
+
+
+def test_select_blocks_until_ready():
+    received = []
+    c1, c2 = make(), make()
+    go(lambda: select([
+        (recv, c1, lambda value, ok: received.append(("c1", value))),
+        (recv, c2, lambda value, ok: received.append(("c2", value))),
+    ]))
+    go(lambda: send(c2, 5, lambda: None))
+    run()
+    assert received == [("c2", 5)]
+    assert not c1.waiting_to_recv
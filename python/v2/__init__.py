@@ -1,103 +1,478 @@
-from random import randint
+from collections import deque
+from random import Random
+from time import monotonic, sleep, perf_counter_ns as clock
 import builtins
+import heapq
+import itertools
+
+
+class Waiter:
+    __slots__ = ("item", "live", "selection", "since")
+
+    def __init__(self, item, selection=None):
+        self.item = item
+        self.live = True
+        # set when the waiter is one of the cases of a blocked select
+        self.selection = selection
+
+
+class WaitingQueue:
+    # once more than this many cancelled waiters are left in the deque (and
+    # they outnumber the live ones) it is rebuilt without them
+    compact_threshold = 64
+
+    __slots__ = ("waiters", "live", "dead", "parks", "waited", "blocked")
+
+    def __init__(self, channel, op):
+        self.waiters = deque()
+        self.live = 0
+        self.dead = 0
+        # how many waiters were woken up, and how long they were parked for
+        self.parks = 0
+        self.waited = 0
+        # what the waiters are blocked on, for deadlock reports
+        self.blocked = (op, channel)
+
+    def __len__(self):
+        return self.live
+
+    def enqueue(self, x, selection=None):
+        waiter = Waiter(x, selection)
+        waiter.since = clock()
+        self.waiters.append(waiter)
+        self.live += 1
+        scheduler.parked[waiter] = self.blocked
+        if tracer is not None:
+            tracer.record("park", None, self.blocked[1], (self.blocked[0], waiter))
+        return waiter
+
+    def dequeue(self):
+        # cancelled waiters are skipped lazily
+        popleft = self.waiters.popleft
+        waiter = popleft()
+        while not waiter.live:
+            self.dead -= 1
+            waiter = popleft()
+        waiter.live = False
+        self.live -= 1
+        self.parks += 1
+        self.waited += clock() - waiter.since
+        scheduler.parked.pop(waiter, None)
+        if tracer is not None:
+            tracer.record("unpark", None, self.blocked[1], waiter)
+        if waiter.selection is not None:
+            waiter.selection.fire()
+        return waiter.item
+
+    def cancel(self, waiter):
+        # attempt to remove the waiter from the queue, returning None if it
+        # was already dequeued or cancelled
+        if not waiter.live:
+            return None
+        waiter.live = False
+        self.live -= 1
+        self.dead += 1
+        scheduler.parked.pop(waiter, None)
+        if tracer is not None:
+            tracer.record("unpark", None, self.blocked[1], waiter)
+        if self.dead > self.compact_threshold and self.dead > self.live:
+            self.waiters = deque(w for w in self.waiters if w.live)
+            self.dead = 0
+        return waiter.item
+
+
+class NoWaiters:
+    # Stands in for a channel's WaitingQueue until a goroutine parks on it.
+    # Plenty of channels never have anything parked on one side of them, or
+    # on either, and so never need the queue and its deque.
+    __slots__ = ()
+
+    waiters = ()
+    # for stats
+    parks = 0
+    waited = 0
+
+    def __len__(self):
+        return 0
+
+
+no_waiters = NoWaiters()
+
+
+class RingBuffer:
+    # fixed capacity FIFO, slots are preallocated so pushing and popping
+    # never allocates
+    __slots__ = ("slots", "head", "size", "pushes", "high_water")
 
+    def __init__(self, capacity):
+        self.slots = [None] * capacity
+        self.head = 0
+        self.size = 0
+        # for stats
+        self.pushes = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, x):
+        slots = self.slots
+        i = self.head + self.size
+        if i >= builtins.len(slots):
+            i -= builtins.len(slots)
+        slots[i] = x
+        self.size += 1
+        self.pushes += 1
+        if self.size > self.high_water:
+            self.high_water = self.size
+
+    def pop(self):
+        slots = self.slots
+        head = self.head
+        x = slots[head]
+        # drop the reference so the value can be collected
+        slots[head] = None
+        head += 1
+        if head == builtins.len(slots):
+            head = 0
+        self.head = head
+        self.size -= 1
+        return x
 
-class WaitingQueue(list):
-    total = 0
 
-    def enqueue(self, x):
-        WaitingQueue.total += 1
-        self.append(x)
+# unbuffered channels never push to their buffer, so they all share this one
+unbuffered = RingBuffer(0)
 
-    def dequeue(self, x=None):
-        if x is None:
-            x = self.pop(0)
-            WaitingQueue.total -= 1
-        else:
-            # attempt to remove the passed in item from the queue
-            idx = self.index(x)
-            if idx is not None:
-                self.pop(idx)
-                WaitingQueue.total -= 1
-        return x
+
+class Deadlock(Exception):
+    def __init__(self, blocked):
+        # what every goroutine was blocked on, as (op, channel, goroutine)
+        self.blocked = blocked
+        lines = ["fatal error: all goroutines are asleep - deadlock"]
+        for op, channel, goroutine in blocked:
+            name = getattr(goroutine, "__qualname__", None) or repr(goroutine)
+            on = "nil channel" if channel is None else repr(channel)
+            lines.append(f"goroutine {name} [{op} on {on}]")
+        super().__init__("\n".join(lines))
 
 
 class Channel:
+    __slots__ = ("capacity", "buffer", "closed", "waiting_to_send", "waiting_to_recv",
+                 "watchers", "handoffs", "select_wins")
+
     def __init__(self, capacity):
         self.capacity = capacity
-        self.buffer = []
+        self.buffer = RingBuffer(capacity) if capacity else unbuffered
         self.closed = False
-        self.waiting_to_send = WaitingQueue()
-        self.waiting_to_recv = WaitingQueue()
+        # see send_queue and recv_queue
+        self.waiting_to_send = no_waiters
+        self.waiting_to_recv = no_waiters
+        # select sets watching this channel
+        self.watchers = None
+        # values passed straight from a sender to a receiver, the rest go
+        # through the buffer
+        self.handoffs = 0
+        # selects that chose a case on this channel
+        self.select_wins = 0
+
+    def send_queue(self):
+        # the queue of blocked senders, made when the first one parks
+        if self.waiting_to_send is no_waiters:
+            self.waiting_to_send = WaitingQueue(self, "send")
+        return self.waiting_to_send
+
+    def recv_queue(self):
+        if self.waiting_to_recv is no_waiters:
+            self.waiting_to_recv = WaitingQueue(self, "recv")
+        return self.waiting_to_recv
+
+
+class Stats:
+    # a snapshot of a channel's counters, see stats. Times are in
+    # nanoseconds and only count parked goroutines that were woken up.
+    __slots__ = ("capacity", "len", "sends", "recvs", "handoffs", "buffered",
+                 "high_water", "select_wins", "send_parks", "send_wait",
+                 "recv_parks", "recv_wait")
+
+    def __init__(self, channel):
+        buffer = channel.buffer
+        self.capacity = channel.capacity
+        self.len = buffer.size
+        self.handoffs = channel.handoffs
+        self.buffered = buffer.pushes
+        self.sends = self.handoffs + self.buffered
+        self.recvs = self.sends - buffer.size
+        self.high_water = buffer.high_water
+        self.select_wins = channel.select_wins
+        self.send_parks = channel.waiting_to_send.parks
+        self.send_wait = channel.waiting_to_send.waited
+        self.recv_parks = channel.waiting_to_recv.parks
+        self.recv_wait = channel.waiting_to_recv.waited
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)}" for name in self.__slots__)
+        return f"Stats({fields})"
 
 
 # Scheduling Methods
 
-execution_queue = []
+class Timers:
+    # A heap of pending timers ordered by deadline. Stopped timers are left
+    # in the heap with their entry blanked out and skipped once they reach
+    # the top, so adding and stopping a timer are both O(log n).
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+        # timers in the heap that weren't stopped
+        self.live = 0
+        # what could still wake a goroutine up: the callbacks of the timers
+        # in the heap and the goroutines parked on their channels, see
+        # waking
+        self.wakers = 0
+
+    def add(self, timer, when):
+        # the counter breaks ties so timers due at the same time fire in
+        # the order they were set
+        entry = [when, next(self.counter), timer]
+        timer.entry = entry
+        heapq.heappush(self.heap, entry)
+        self.live += 1
+        self.wakers += timer.wakers()
+
+    def remove(self, timer):
+        entry = timer.entry
+        if entry is None:
+            return False
+        entry[2] = None
+        timer.entry = None
+        self.live -= 1
+        self.wakers -= timer.wakers()
+        return True
+
+    def next(self):
+        # the earliest deadline, or None
+        heap = self.heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def fire(self, now):
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            when, _, timer = heapq.heappop(heap)
+            if timer is None:
+                continue
+            timer.entry = None
+            self.live -= 1
+            self.wakers -= timer.wakers()
+            if timer.interval:
+                # like Go's tickers, one that fell behind drops the ticks it
+                # missed rather than firing them all at once
+                missed = (now - when) // timer.interval
+                self.add(timer, when + (missed + 1) * timer.interval)
+            timer.fire(now)
+
+    def waking(self):
+        # whether a pending timer could still wake a goroutine up: it runs a
+        # callback or someone is parked on its channel
+        return self.wakers > 0
+
+    def clear(self):
+        for _, _, timer in self.heap:
+            if timer is not None:
+                timer.entry = None
+        self.heap.clear()
+        self.live = 0
+        self.wakers = 0
+
+
+class Scheduler:
+    # how many callbacks run between checks of the run queue
+    batch_size = 256
+
+    def __init__(self):
+        self.queue = deque()
+        # every waiter that's blocked, and what it's blocked on
+        self.parked = {}
+        self.timers = Timers()
+        self.steps = 0
+        self.batches = 0
+        # picks among the ready cases of a select, see seed
+        self.random = Random()
+        self.turns = itertools.count()
+
+    def go(self, callback, *args):
+        if callback:
+            self.queue.append((callback, args))
+            if tracer is not None:
+                tracer.record("go", None, None, callback)
+
+    def ready(self, callback, args):
+        # like go, but takes the argument tuple as is so channel operations
+        # can resume a parked goroutine without wrapping it in a closure
+        self.queue.append((callback, args))
+
+    def run(self):
+        queue = self.queue
+        popleft = queue.popleft
+        batch_size = self.batch_size
+        timers = self.timers
+        steps = 0
+        try:
+            while True:
+                while queue:
+                    n = builtins.len(queue)
+                    if n > batch_size:
+                        n = batch_size
+                    self.batches += 1
+                    for _ in range(n):
+                        callback, args = popleft()
+                        callback(*args)
+                    steps += n
+                    if timers.live and timers.next() <= monotonic():
+                        timers.fire(monotonic())
+                # nothing is ready, so sleep until the next timer unless
+                # none of them can wake anything up
+                if not timers.live or not timers.waking():
+                    break
+                sleep(max(timers.next() - monotonic(), 0))
+                timers.fire(monotonic())
+        except BaseException:
+            # the failed run's goroutines are gone, so they can't be
+            # reported as deadlocked by the next one, and its timers don't
+            # fire during it
+            self.parked.clear()
+            queue.clear()
+            timers.clear()
+            raise
+        finally:
+            self.steps += steps
+
+        if self.parked:
+            blocked = self.blocked()
+            # like the rest of a Go program, the blocked goroutines and
+            # their timers are gone
+            self.parked.clear()
+            timers.clear()
+            raise Deadlock(blocked)
+
+    def blocked(self):
+        blocked = []
+        for waiter, (op, channel) in self.parked.items():
+            goroutine = waiter.item[1] if op == "send" else waiter.item
+            if waiter.selection is not None:
+                op = "select " + op
+            blocked.append((op, channel, goroutine))
+        return blocked
+
+
+scheduler = Scheduler()
+
+
+def go(callback, *args):
+    scheduler.go(callback, *args)
 
 
-def go(callback):
-    if callback:
-        execution_queue.append(callback)
+def run():
+    scheduler.run()
 
 
-def run():
-    WaitingQueue.total = 0
+def seed(a=None):
+    # selects choose the same cases again after the same seed, to make
+    # test and benchmark runs reproducible
+    scheduler.random.seed(a)
+    scheduler.turns = itertools.count()
 
-    while execution_queue:
-        f = execution_queue.pop(0)
-        f()
 
-    if WaitingQueue.total > 0:
-        raise Exception("fatal error: all goroutines are asleep - deadlock")
+# Tracing
+
+# where events are recorded while tracing, see start_trace
+tracer = None
+
+
+def start_trace(capacity=None):
+    # record events until stop_trace, keeping the last `capacity` of them
+    # (tracing.CAPACITY by default). tracing is only imported once it's
+    # used, so the runtime works without it.
+    import tracing
+    global tracer
+    tracer = tracing.Tracer(tracing.CAPACITY if capacity is None else capacity)
+    return tracer
+
+
+def stop_trace():
+    global tracer
+    stopped, tracer = tracer, None
+    return stopped
 
 
 # Channel Methods
 
+# what a receive on a closed channel yields
+CLOSED = (None, False)
+
+
 def make(capacity=0):
     return Channel(capacity)
 
 
 def len(channel):
-    return builtins.len(channel.buffer)
+    return channel.buffer.size
 
 
 def cap(channel):
     return channel.capacity
 
 
+def stats(channel):
+    return Stats(channel)
+
+
 def send(channel, value, callback):
     # "A send on a nil channel blocks forever."
     if channel is None:
-        WaitingQueue.total += 1
+        scheduler.parked[Waiter((value, callback))] = ("send", None)
         return
 
+    if channel.watchers:
+        notify_watchers(channel)
+    if tracer is not None:
+        tracer.record("send", None, channel, channel.buffer.size)
+
     # "A send on a closed channel proceeds by causing a run-time panic."
     if channel.closed:
         raise Exception("send on closed channel")
 
     # "A send on an unbuffered channel can proceed if a receiver is ready."
     if channel.waiting_to_recv:
+        channel.handoffs += 1
         receiver = channel.waiting_to_recv.dequeue()
+        # hand the value straight to the receiver
         go(callback)
-        go(lambda: receiver(value, True))
+        scheduler.ready(receiver, (value, True))
         return
 
     # "A send on a buffered channel can proceed if there is room in the buffer."
     if len(channel) < cap(channel):
-        channel.buffer.append(value)
+        channel.buffer.push(value)
         go(callback)
         return
 
-    channel.waiting_to_send.enqueue((value, callback))
+    channel.send_queue().enqueue((value, callback))
 
 
 def recv(channel, callback):
     # "Receiving from a nil channel blocks forever."
     if channel is None:
-        WaitingQueue.total += 1
+        scheduler.parked[Waiter(callback)] = ("recv", None)
         return
 
+    if channel.watchers:
+        notify_watchers(channel)
+    if tracer is not None:
+        tracer.record("recv", None, channel, channel.buffer.size)
+
     # if there is a value in the buffer, receive it
     if len(channel) > 0:
         # pop the first element, because:
@@ -105,24 +480,31 @@ def recv(channel, callback):
         # For example, if one goroutine sends values on a channel and
         # a second goroutine receives them,
         # the values are received in the order sent. "
-        value = channel.buffer.pop(0)
-        go(lambda: callback(value, True))
+        value = channel.buffer.pop()
+        # the freed slot goes to the first blocked sender, so its value
+        # stays ahead of anything sent later
+        if channel.waiting_to_send:
+            sent, sender = channel.waiting_to_send.dequeue()
+            channel.buffer.push(sent)
+            go(sender)
+        scheduler.ready(callback, (value, True))
         return
 
     # "if anything is currently blocked on sending for this channel, receive it"
     if channel.waiting_to_send:
+        channel.handoffs += 1
         value, sender = channel.waiting_to_send.dequeue()
-        go(lambda: callback(value, True))
+        scheduler.ready(callback, (value, True))
         go(sender)
         return
 
     # "A receive operation on a closed channel can always proceed immediately,
     # yielding the element type's zero value after any previously sent values have been received."
     if channel.closed:
-        go(lambda: callback(None, False))
+        scheduler.ready(callback, CLOSED)
         return
 
-    channel.waiting_to_recv.enqueue(callback)
+    channel.recv_queue().enqueue(callback)
 
 
 def close(channel):
@@ -130,6 +512,11 @@ def close(channel):
     if channel.closed:
         raise Exception("close of closed channel")
 
+    if channel.watchers:
+        notify_watchers(channel)
+    if tracer is not None:
+        tracer.record("close", None, channel)
+
     channel.closed = True
 
     # complete any senders
@@ -143,63 +530,381 @@ def close(channel):
         recv(channel, callback)
 
 
+# Batch Methods
+
+def take(channel, n):
+    # receive up to n values that are available without blocking
+    if channel.watchers:
+        notify_watchers(channel)
+    if tracer is not None:
+        tracer.record("recv", None, channel, channel.buffer.size)
+
+    values = []
+    buffer = channel.buffer
+    senders = channel.waiting_to_send
+    while n > 0:
+        if buffer.size:
+            values.append(buffer.pop())
+            if senders:
+                value, sender = senders.dequeue()
+                buffer.push(value)
+                go(sender)
+        elif senders:
+            channel.handoffs += 1
+            value, sender = senders.dequeue()
+            values.append(value)
+            go(sender)
+        else:
+            break
+        n -= 1
+    return values
+
+
+def send_many(channel, values, callback):
+    values = iter(values)
+
+    def proceed():
+        if channel is not None and channel.watchers:
+            notify_watchers(channel)
+        if channel is not None and tracer is not None:
+            tracer.record("send", None, channel, channel.buffer.size)
+
+        for value in values:
+            if channel is None or channel.closed:
+                # block forever or panic, just like send
+                send(channel, value, proceed)
+                return
+            if channel.waiting_to_recv:
+                channel.handoffs += 1
+                scheduler.ready(channel.waiting_to_recv.dequeue(), (value, True))
+            elif channel.buffer.size < channel.capacity:
+                channel.buffer.push(value)
+            else:
+                # block on this one and carry on once it's sent
+                send(channel, value, proceed)
+                return
+        go(callback)
+
+    proceed()
+
+
+def recv_many(channel, max_n, callback):
+    def onrecv(value, ok):
+        if ok:
+            values = [value]
+            values += take(channel, max_n - 1)
+            callback(values, True)
+        else:
+            callback([], False)
+
+    if channel is not None:
+        values = take(channel, max_n)
+        if values:
+            scheduler.ready(callback, (values, True))
+            return
+
+    recv(channel, onrecv)
+
+
 # Selection
 
 # used to indicate the default case in a select
 default = object()
 
-
-def select(cases, callback=None):
-    def is_ready(case):
-        if case[0] == send:
-            return case[1].closed or len(case[1]) < cap(case[1]) or case[1].waiting_to_recv
-        elif case[0] == recv:
-            return case[1].closed or len(case[1]) > 0 or case[1].waiting_to_send
-        elif case[0] == default:
-            return False
-
-    # first see if any of the cases are ready to proceed
-    ready = [case for case in cases if is_ready(case)]
-    if ready:
-        # pick a random one
-        case = ready[randint(0, builtins.len(ready)-1)]
-        if case[0] == send:
+# How a select picks among the cases that are ready: at random like Go,
+# taking turns, or always the first one in the order they're listed. Only
+# a SelectSet keeps track of whose turn it is. Selects on plain lists of
+# cases take turns through one counter they all share, which is only fair
+# as long as a single select is taking turns.
+RANDOM = "random"
+ROUND_ROBIN = "round_robin"
+PRIORITY = "priority"
+
+
+def can_send(channel):
+    return channel.closed or channel.waiting_to_recv or len(channel) < cap(channel)
+
+
+def can_recv(channel):
+    return channel.closed or len(channel) > 0 or channel.waiting_to_send
+
+
+def notify_watchers(channel):
+    # the channel's state is about to change, so any select set watching it
+    # has to re-check its cases on that channel
+    for selectset in channel.watchers:
+        selectset.dirty.add(channel)
+
+
+class SelectSet:
+    # A select whose cases are compiled once so it can be re-entered in a
+    # loop. Channels mark it dirty when their state changes, so each select
+    # only re-checks the channels that changed since the last one.
+
+    def __init__(self, cases, policy=RANDOM):
+        self.cases = []
+        self.default = None
+        self.policy = policy
+        # where the next round robin pick starts looking
+        self.turn = 0
+        self.channels = {}
+        for case in cases:
+            if case[0] is default:
+                self.default = case
+                continue
+            self.cases.append(case)
+            channel = case[1]
+            # cases on a nil channel are never ready
+            if channel is None:
+                continue
+            if channel not in self.channels:
+                self.channels[channel] = []
+                if channel.watchers is None:
+                    channel.watchers = []
+                channel.watchers.append(self)
+            self.channels[channel].append(builtins.len(self.cases) - 1)
+        self.ready = set()
+        self.dirty = set(self.channels)
+
+    def poll(self):
+        # bring the set of ready cases up to date
+        cases, ready = self.cases, self.ready
+        for channel in self.dirty:
+            for i in self.channels[channel]:
+                if can_send(channel) if cases[i][0] is send else can_recv(channel):
+                    ready.add(i)
+                else:
+                    ready.discard(i)
+        self.dirty.clear()
+        return ready
+
+    def pick(self):
+        # one of the ready cases by the set's policy, or the default case
+        ready = self.poll()
+        if not ready:
+            return self.default
+        policy = self.policy
+        if policy is PRIORITY:
+            i = min(ready)
+        elif policy is ROUND_ROBIN:
+            i = min((j for j in ready if j >= self.turn), default=None)
+            if i is None:
+                i = min(ready)
+            self.turn = i + 1
+        elif builtins.len(ready) == 1:
+            i = next(iter(ready))
+        else:
+            n = int(scheduler.random.random() * builtins.len(ready))
+            i = next(itertools.islice(ready, n, None))
+        return self.cases[i]
+
+    def close(self):
+        # stop watching the channels
+        for channel in self.channels:
+            channel.watchers.remove(self)
+        self.channels = {}
+        self.cases = []
+        self.ready.clear()
+        self.dirty.clear()
+
+
+class Selection:
+    # the waiters a blocked select left on its channels, once one of them is
+    # dequeued the rest are cancelled right away so only one case fires
+    __slots__ = ("waiters",)
+
+    def __init__(self):
+        self.waiters = []
+
+    def fire(self):
+        for channel, queue, waiter in self.waiters:
+            if queue.cancel(waiter) is not None and channel.watchers:
+                notify_watchers(channel)
+
+
+def trace_select(cases, case):
+    # the default case isn't in a SelectSet's cases
+    index = cases.index(case) if case in cases else -1
+    tracer.record("select", None, case[1] if case[0] is not default else None, index)
+
+
+def pick(cases, policy):
+    # one of the ready cases by the policy, or else the default case if
+    # there is one
+    if policy is ROUND_ROBIN and cases:
+        # the turn is shared with every other select, see ROUND_ROBIN
+        turn = next(scheduler.turns) % builtins.len(cases)
+        cases = itertools.chain(cases[turn:], cases[:turn])
+    # the list of ready cases is only made once there are two of them
+    first = ready = fallback = None
+    for c in cases:
+        if c[0] is send:
+            if c[1] is None or not can_send(c[1]):
+                continue
+        elif c[0] is recv:
+            if c[1] is None or not can_recv(c[1]):
+                continue
+        else:
+            fallback = c
+            continue
+        if policy is not RANDOM:
+            return c
+        if first is None:
+            first = c
+        elif ready is None:
+            ready = [first, c]
+        else:
+            ready.append(c)
+    if ready is not None:
+        return ready[int(scheduler.random.random() * builtins.len(ready))]
+    return first or fallback
+
+
+def select(cases, callback=None, policy=RANDOM):
+    # first see if any of the cases are ready to proceed, a SelectSet
+    # picks by its own policy
+    if isinstance(cases, SelectSet):
+        case = cases.pick()
+        cases = cases.cases
+    else:
+        case = pick(cases, policy)
+
+    if case is not None:
+        if tracer is not None:
+            trace_select(cases, case)
+        if case[0] is send:
+            case[1].select_wins += 1
             send(case[1], case[2], case[3])
-        elif case[0] == recv:
+        elif case[0] is recv:
+            case[1].select_wins += 1
             recv(case[1], case[2])
-        go(callback)
-        return
-
-    # next see if there's a default case
-    defaults = [case for case in cases if case[0] == default]
-    if defaults:
-        defaults[0]()
+        else:
+            # there's a default case and nothing else is ready
+            case[1]()
         go(callback)
         return
 
     # finally we will enqueue each case into the waiting queues
-    # we also update each callback so it will cleanup all the
-    # other cases so only one is fired
+    # we also update each callback so it will continue with the
+    # select's callback once its case has fired
+
+    selection = Selection()
+
+    def wrap_send(case):
+        def onsend():
+            case[1].select_wins += 1
+            if tracer is not None:
+                trace_select(cases, case)
+            case[3]()
+            go(callback)
+        return onsend
+
+    def wrap_recv(case):
+        def onrecv(value, ok):
+            case[1].select_wins += 1
+            if tracer is not None:
+                trace_select(cases, case)
+            case[2](value, ok)
+            go(callback)
+        return onrecv
 
-    wrapped = []
+    for case in cases:
+        channel = case[1]
+        if channel is None:
+            continue
+        if channel.watchers:
+            notify_watchers(channel)
+        if case[0] is send:
+            queue = channel.send_queue()
+            waiter = queue.enqueue((case[2], wrap_send(case)), selection)
+        else:
+            queue = channel.recv_queue()
+            waiter = queue.enqueue(wrap_recv(case), selection)
+        selection.waiters.append((channel, queue, waiter))
 
-    def cleanup():
-        for case in wrapped:
-            if case[0] == send:
-                case[1].waiting_to_send.dequeue((case[2], case[3]))
-            elif case[0] == recv:
-                case[1].waiting_to_recv.dequeue(case[2])
-        go(callback)
+    # "a select with no cases (or only nil channels) blocks forever"
+    if not selection.waiters:
+        scheduler.parked[Waiter(callback)] = ("select", None)
 
-    # overwrite all the callbacks and enqueue into the waiting queues
-    for case in cases:
-        if case[0] == send:
-            new_case = (case[0], case[1], case[2],
-                        lambda: (cleanup(), case[3]()))
-            case[1].waiting_to_send.enqueue((new_case[2], new_case[3]))
-            wrapped.append(new_case)
-        elif case[0] == recv:
-            new_case = (case[0], case[1],
-                        lambda value, ok: (cleanup(), case[2](value, ok)))
-            case[1].waiting_to_recv.enqueue(new_case[2])
-            wrapped.append(new_case)
+
+# Timers
+
+class TimerQueue(WaitingQueue):
+    # the receivers parked on a timer's channel, counted in the timers'
+    # wakers while the timer is pending
+    __slots__ = ("timer",)
+
+    def __init__(self, timer):
+        super().__init__(timer.channel, "recv")
+        self.timer = timer
+
+    def enqueue(self, x, selection=None):
+        if self.timer.entry is not None:
+            scheduler.timers.wakers += 1
+        return super().enqueue(x, selection)
+
+    def dequeue(self):
+        if self.timer.entry is not None:
+            scheduler.timers.wakers -= 1
+        return super().dequeue()
+
+    def cancel(self, waiter):
+        if waiter.live and self.timer.entry is not None:
+            scheduler.timers.wakers -= 1
+        return super().cancel(waiter)
+
+
+class Timer:
+    # Like Go's time.Timer, `channel` receives the (monotonic) time once the
+    # timer fires. Tickers fire every `interval` seconds and timers made by
+    # after_func run their callback instead.
+    __slots__ = ("channel", "interval", "callback", "entry")
+
+    def __init__(self, seconds, interval=None, callback=None):
+        # "The channel has a buffer of one", so firing never blocks
+        self.channel = Channel(1)
+        self.channel.waiting_to_recv = TimerQueue(self)
+        self.interval = interval
+        self.callback = callback
+        self.entry = None
+        scheduler.timers.add(self, monotonic() + seconds)
+
+    def fire(self, now):
+        if self.callback is not None:
+            go(self.callback)
+        elif can_send(self.channel):
+            send(self.channel, now, None)
+
+    def wakers(self):
+        # what this timer could wake up while it's pending
+        return (self.callback is not None) + builtins.len(self.channel.waiting_to_recv)
+
+    def stop(self):
+        # returns whether the timer was stopped before it fired
+        return scheduler.timers.remove(self)
+
+    def reset(self, seconds):
+        # returns whether the timer was still pending
+        pending = scheduler.timers.remove(self)
+        scheduler.timers.add(self, monotonic() + seconds)
+        return pending
+
+
+def timer(seconds):
+    return Timer(seconds)
+
+
+def ticker(seconds):
+    if seconds <= 0:
+        raise ValueError("non-positive interval for ticker")
+    return Timer(seconds, seconds)
+
+
+def after(seconds):
+    # a channel that receives the time after `seconds`, for timeouts:
+    #   select([(recv, ch, onrecv), (recv, after(1), ontimeout)])
+    return Timer(seconds).channel
+
+
+def after_func(seconds, callback):
+    return Timer(seconds, callback=callback)
@@ -0,0 +1,86 @@
+"""
+A fixed set of worker goroutines fed through a channel, for bounded
+concurrency on top of go().
+"""
+from . import close, go, make, recv, send
+from .sync import WaitGroup
+
+
+class Pool:
+    # `workers` goroutines take jobs from a channel with room for `backlog`
+    # of them, so submit blocks once the workers fall behind and memory
+    # stays bounded however many jobs there are.
+    #
+    # A job is called as f(*args, done) and calls done(result) or
+    # done(error=e) when it's finished, or raises. Results are collected in
+    # the order the jobs were submitted. After the first error the jobs
+    # that haven't started yet are dropped.
+
+    def __init__(self, workers, backlog=None):
+        if workers < 1:
+            raise ValueError("a pool needs at least one worker")
+        self.jobs = make(backlog or workers)
+        self.results = []
+        self.error = None
+        self.wg = WaitGroup()
+        self.wg.add(workers)
+        for _ in range(workers):
+            go(self.work)
+
+    def work(self):
+        recv(self.jobs, self.run)
+
+    def run(self, job, ok):
+        if not ok:
+            self.wg.done()
+            return
+        if self.error is not None:
+            # drain the jobs that were already queued
+            self.work()
+            return
+        i, f, args = job
+
+        def done(result=None, error=None):
+            if error is not None:
+                self.fail(error)
+            else:
+                self.results[i] = result
+            go(self.work)
+
+        try:
+            f(*args, done)
+        except Exception as e:
+            self.fail(e)
+            go(self.work)
+
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+
+    def submit(self, f, *args, callback=None):
+        # continues with callback once the job is queued
+        if self.error is not None:
+            go(callback)
+            return
+        self.results.append(None)
+        send(self.jobs, (len(self.results) - 1, f, args), callback)
+
+    def wait(self, callback):
+        # no more jobs, continues with callback(results, error) once the
+        # workers are done
+        if not self.jobs.closed:
+            close(self.jobs)
+        self.wg.wait(lambda: callback(self.results, self.error))
+
+    def map(self, f, items, callback):
+        items = iter(items)
+
+        def submit_next():
+            for item in items:
+                if self.error is not None:
+                    break
+                self.submit(f, item, callback=submit_next)
+                return
+            self.wait(callback)
+
+        submit_next()
@@ -0,0 +1,177 @@
+"""
+WaitGroup, Mutex, RWMutex, Once and Semaphore, like Go's sync package and
+golang.org/x/sync/semaphore, for the callback runtime.
+
+Methods that can block take the callback to continue with, just like send
+and recv. Parked goroutines are woken in the order they parked, each in
+O(1), and show up in deadlock reports like the ones parked on channels.
+"""
+from collections import deque
+from . import Waiter, go, scheduler
+
+
+class WaitList:
+    # the goroutines parked on a primitive, oldest first, along with how
+    # much of it they are waiting for
+    def __init__(self, owner, op):
+        self.waiters = deque()
+        self.blocked = (op, owner)
+
+    def __len__(self):
+        return len(self.waiters)
+
+    def park(self, callback, weight=1):
+        waiter = Waiter(callback)
+        self.waiters.append((waiter, weight))
+        scheduler.parked[waiter] = self.blocked
+
+    def weight(self):
+        # what the first goroutine is waiting for
+        return self.waiters[0][1]
+
+    def wake(self):
+        waiter, _ = self.waiters.popleft()
+        scheduler.parked.pop(waiter, None)
+        go(waiter.item)
+
+
+class WaitGroup:
+    def __init__(self):
+        self.count = 0
+        self.waiting = WaitList(self, "wait")
+
+    def add(self, delta):
+        self.count += delta
+        if self.count < 0:
+            raise Exception("sync: negative WaitGroup counter")
+        if self.count == 0:
+            while self.waiting:
+                self.waiting.wake()
+
+    def done(self):
+        self.add(-1)
+
+    def wait(self, callback):
+        if self.count == 0:
+            go(callback)
+        else:
+            self.waiting.park(callback)
+
+
+class Mutex:
+    # unlock hands the mutex straight to the first goroutine waiting for it
+
+    def __init__(self):
+        self.locked = False
+        self.waiting = WaitList(self, "lock")
+
+    def lock(self, callback):
+        if self.locked:
+            self.waiting.park(callback)
+        else:
+            self.locked = True
+            go(callback)
+
+    def try_lock(self):
+        if self.locked:
+            return False
+        self.locked = True
+        return True
+
+    def unlock(self):
+        if not self.locked:
+            raise Exception("sync: unlock of unlocked mutex")
+        if self.waiting:
+            self.waiting.wake()
+        else:
+            self.locked = False
+
+
+class RWMutex:
+    # Once a writer is waiting new readers queue up behind it, and when it
+    # unlocks every reader that queued up is let in before the next writer,
+    # so neither side can starve the other.
+
+    def __init__(self):
+        self.readers = 0
+        self.writer = False
+        self.waiting_readers = WaitList(self, "rlock")
+        self.waiting_writers = WaitList(self, "lock")
+
+    def rlock(self, callback):
+        if self.writer or self.waiting_writers:
+            self.waiting_readers.park(callback)
+        else:
+            self.readers += 1
+            go(callback)
+
+    def runlock(self):
+        if self.readers == 0:
+            raise Exception("sync: RUnlock of unlocked RWMutex")
+        self.readers -= 1
+        if self.readers == 0 and self.waiting_writers:
+            self.writer = True
+            self.waiting_writers.wake()
+
+    def lock(self, callback):
+        if self.writer or self.readers:
+            self.waiting_writers.park(callback)
+        else:
+            self.writer = True
+            go(callback)
+
+    def unlock(self):
+        if not self.writer:
+            raise Exception("sync: Unlock of unlocked RWMutex")
+        self.writer = False
+        if self.waiting_readers:
+            self.readers += len(self.waiting_readers)
+            while self.waiting_readers:
+                self.waiting_readers.wake()
+        elif self.waiting_writers:
+            self.writer = True
+            self.waiting_writers.wake()
+
+
+class Once:
+    def __init__(self):
+        self.done = False
+
+    def do(self, f):
+        if not self.done:
+            self.done = True
+            f()
+
+
+class Semaphore:
+    # A weighted semaphore. Goroutines are let in in the order they asked,
+    # so a big acquire isn't starved by a stream of small ones.
+
+    def __init__(self, size):
+        self.size = size
+        self.current = 0
+        self.waiting = WaitList(self, "acquire")
+
+    def acquire(self, n, callback):
+        if n > self.size:
+            raise ValueError("semaphore: acquire of more than its size")
+        if self.current + n <= self.size and not self.waiting:
+            self.current += n
+            go(callback)
+        else:
+            self.waiting.park(callback, n)
+
+    def try_acquire(self, n=1):
+        if self.current + n <= self.size and not self.waiting:
+            self.current += n
+            return True
+        return False
+
+    def release(self, n=1):
+        self.current -= n
+        if self.current < 0:
+            raise Exception("semaphore: released more than held")
+        waiting = self.waiting
+        while waiting and self.current + waiting.weight() <= self.size:
+            self.current += waiting.weight()
+            waiting.wake()
@@ -1,4 +1,5 @@
-from . import Channel, select, send, make, close, recv, go, run
+import builtins
+from . import Channel, select, send, send_many, make, close, recv, recv_many, go, run, len, cap, stats
 
 
 def test_buffering():
@@ -9,3 +10,77 @@ def test_buffering():
     go(lambda: send(ch, 1, lambda: send(ch, 2, lambda: send(ch, 3, lambda: close(ch)))))
     go(lambda: recv(ch, callback))
     run()
+
+
+def test_buffer_wraps_around():
+    received = []
+
+    def onrecv(value, ok):
+        received.append(value)
+
+    ch = make(2)
+    for i in range(5):
+        go(lambda i=i: send(ch, i, lambda: None))
+        go(lambda: recv(ch, onrecv))
+    run()
+    assert received == [0, 1, 2, 3, 4]
+    assert len(ch) == 0 and cap(ch) == 2
+
+
+def test_blocked_sender_keeps_its_place():
+    received = []
+
+    def onrecv(value, ok):
+        received.append(value)
+
+    ch = make(1)
+    go(lambda: send(ch, 1, lambda: None))
+    go(lambda: send(ch, 2, lambda: None))
+    go(lambda: recv(ch, onrecv))
+    go(lambda: send(ch, 3, lambda: None))
+    go(lambda: recv(ch, onrecv))
+    go(lambda: recv(ch, onrecv))
+    run()
+    assert received == [1, 2, 3]
+
+
+def test_send_many_fills_buffer():
+    batches = []
+
+    def onrecv(values, ok):
+        batches.append((values, ok))
+        if ok:
+            recv_many(ch, 4, onrecv)
+
+    ch = make(3)
+    go(send_many, ch, range(10), lambda: close(ch))
+    go(recv_many, ch, 4, onrecv)
+    run()
+    assert [x for values, ok in batches for x in values] == list(range(10))
+    assert all(builtins.len(values) <= 4 for values, ok in batches)
+    assert batches[0][0] == [0, 1, 2, 3]
+    assert batches[-1] == ([], False)
+
+
+def test_stats():
+    ch = make(2)
+    received = []
+    # fill the buffer, park a sender, then drain it all
+    send_many(ch, [1, 2, 3], None)
+    go(recv_many, ch, 8, lambda values, ok: received.extend(values))
+    run()
+    recv(ch, lambda value, ok: received.append(value))
+    go(send, ch, 4, None)
+    run()
+    assert received == [1, 2, 3, 4]
+
+    s = stats(ch)
+    assert (s.sends, s.recvs, s.len) == (4, 4, 0)
+    # 3 was refilled into the buffer, 4 went straight to the parked receiver
+    assert (s.buffered, s.handoffs, s.high_water) == (3, 1, 2)
+    assert (s.send_parks, s.recv_parks) == (1, 1)
+    assert s.send_wait > 0 and s.recv_wait > 0
+    assert s.select_wins == 0
+
+    select([(send, ch, 5, lambda: None), (recv, make(), lambda value, ok: None)])
+    assert stats(ch).select_wins == 1
@@ -0,0 +1,63 @@
+from . import close, go, make, no_waiters, recv, run, send
+
+
+def test_go_passes_arguments():
+    results = []
+    go(results.append, 1)
+    go(lambda: results.append(2))
+    run()
+    assert results == [1, 2]
+
+
+def test_ping_pong():
+    ping, pong = make(), make()
+    results = []
+
+    def player(src, dst, n):
+        def onrecv(value, ok):
+            if not ok:
+                return
+            results.append(value)
+            if value < n:
+                send(dst, value + 1, lambda: player(src, dst, n))
+            else:
+                close(dst)
+        recv(src, onrecv)
+
+    go(player, ping, pong, 10)
+    go(player, pong, ping, 10)
+    go(send, ping, 0, None)
+    run()
+    assert results == list(range(11))
+
+
+def test_waiting_queues_are_made_on_first_park():
+    ch = make()
+    assert not hasattr(ch, "__dict__")
+    assert ch.waiting_to_send is ch.waiting_to_recv is no_waiters
+    received = []
+    recv(ch, lambda value, ok: received.append(value))
+    assert ch.waiting_to_send is no_waiters
+    assert ch.waiting_to_recv is not no_waiters
+    send(ch, 1, None)
+    run()
+    assert received == [1]
+
+
+def test_failed_run_leaves_nothing_behind():
+    ch = make()
+    recv(ch, lambda value, ok: None)
+    go(lambda: 1 / 0)
+    go(lambda: None)
+    try:
+        run()
+    except ZeroDivisionError:
+        pass
+    else:
+        assert False, "expected the callback's error"
+    # neither the parked recv nor the callbacks that didn't get to run
+    # belong to the next run
+    ran = []
+    go(lambda: ran.append(True))
+    run()
+    assert ran == [True]
@@ -0,0 +1,42 @@
+from . import after_func, go, run
+from .pool import Pool
+
+
+def test_map():
+    running = [0]
+    peak = [0]
+
+    def square(x, done):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+
+        def finish():
+            running[0] -= 1
+            done(x * x)
+        go(finish)
+
+    results = []
+    pool = Pool(3)
+    pool.map(square, range(100), lambda values, error: results.append((values, error)))
+    run()
+    assert results == [([x * x for x in range(100)], None)]
+    assert 1 < peak[0] <= 3
+    # only the backlog is ever queued up
+    assert pool.jobs.buffer.high_water <= 3
+
+
+def test_first_error_drops_the_rest():
+    started = []
+
+    def job(x, done):
+        started.append(x)
+        if x == 2:
+            raise ValueError(x)
+        after_func(0.001, lambda: done(x))
+
+    results = []
+    Pool(2, backlog=1).map(job, range(1000), lambda values, error: results.append(error))
+    run()
+    error, = results
+    assert isinstance(error, ValueError)
+    assert len(started) < 10
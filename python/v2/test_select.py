@@ -0,0 +1,105 @@
+from . import PRIORITY, RANDOM, ROUND_ROBIN, SelectSet, default, seed, select, send, make, recv, go, run
+
+
+def test_select_default():
+    results = []
+    ch = make()
+    select([
+        (recv, ch, lambda value, ok: results.append(value)),
+        (default, lambda: results.append("default")),
+    ])
+    run()
+    assert results == ["default"]
+
+
+def test_blocked_select_fires_once():
+    results = []
+    c1, c2 = make(), make()
+    select([
+        (recv, c1, lambda value, ok: results.append(("c1", value))),
+        (recv, c2, lambda value, ok: results.append(("c2", value))),
+    ])
+    # both senders arrive before the select's callback gets to run
+    go(send, c1, 1, None)
+    go(send, c2, 2, None)
+    go(recv, c2, lambda value, ok: results.append(("main", value)))
+    run()
+    assert results in ([("c1", 1), ("main", 2)], [("main", 2), ("c1", 1)])
+    assert not c1.waiting_to_recv and not c2.waiting_to_recv
+
+
+def test_select_set_tracks_ready_channels():
+    channels = [make(1) for _ in range(100)]
+    received = []
+    selectset = SelectSet(
+        [(recv, ch, lambda value, ok: received.append(value)) for ch in channels]
+        + [(default, lambda: received.append(None))])
+    assert selectset.poll() == set()
+    assert not selectset.dirty
+
+    go(send, channels[42], 42, None)
+    run()
+    assert selectset.dirty == {channels[42]}
+    select(selectset)
+    run()
+    select(selectset)
+    assert received == [42, None]
+
+    selectset.close()
+    assert all(not ch.watchers for ch in channels)
+
+
+def picks(policy, selects, selectset=False):
+    # the channels that a run of selects over 4 ready channels picked
+    channels = [make(selects) for _ in range(4)]
+    for ch in channels:
+        for _ in range(selects):
+            send(ch, ch, None)
+    picked = []
+    cases = [(recv, ch, lambda value, ok: picked.append(channels.index(value))) for ch in channels]
+    if selectset:
+        cases = SelectSet(cases, policy)
+    for _ in range(selects):
+        select(cases, policy=policy)
+        run()
+    return picked
+
+
+def test_select_seed_is_reproducible():
+    for selectset in (False, True):
+        seed(7)
+        first = picks(RANDOM, 50, selectset)
+        seed(7)
+        assert picks(RANDOM, 50, selectset) == first
+        assert len(set(first)) == 4
+
+
+def test_select_priority():
+    assert picks(PRIORITY, 8) == [0] * 8
+    assert picks(PRIORITY, 8, selectset=True) == [0] * 8
+
+
+def test_select_round_robin():
+    assert picks(ROUND_ROBIN, 8, selectset=True) == [0, 1, 2, 3] * 2
+    seed()
+    assert picks(ROUND_ROBIN, 8) == [0, 1, 2, 3] * 2
+
+
+def test_interleaved_select_sets_take_turns():
+    # each set keeps its own turn, however its selects are interleaved
+    # with the others'
+    picked = [[], []]
+    selectsets = []
+    for i in range(2):
+        channels = [make(8) for _ in range(4)]
+        for j, ch in enumerate(channels):
+            for _ in range(8):
+                send(ch, j, None)
+        selectsets.append(SelectSet(
+            [(recv, ch, lambda value, ok, i=i: picked[i].append(value)) for ch in channels],
+            ROUND_ROBIN))
+    for _ in range(8):
+        for selectset in selectsets:
+            select(selectset)
+            run()
+    assert picked == [[0, 1, 2, 3] * 2] * 2
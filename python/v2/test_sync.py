@@ -0,0 +1,85 @@
+from . import Deadlock, go, run
+from .sync import Mutex, Once, RWMutex, Semaphore, WaitGroup
+
+
+def test_wait_group():
+    wg = WaitGroup()
+    results = []
+    wg.add(3)
+    for i in range(3):
+        go(lambda i=i: (results.append(i), wg.done()))
+    wg.wait(lambda: results.append("done"))
+    run()
+    assert results == [0, 1, 2, "done"]
+    try:
+        wg.done()
+    except Exception as e:
+        assert str(e) == "sync: negative WaitGroup counter"
+    else:
+        assert False
+
+
+def test_mutex_hands_off_in_order():
+    mu = Mutex()
+    results = []
+
+    def critical(i):
+        def f():
+            results.append(i)
+            go(mu.unlock)
+        return f
+
+    for i in range(5):
+        go(mu.lock, critical(i))
+    run()
+    assert results == list(range(5))
+    assert not mu.locked and mu.try_lock()
+
+
+def test_rwmutex():
+    rw = RWMutex()
+    results = []
+    rw.rlock(lambda: results.append("r1"))
+    rw.lock(lambda: (results.append("w"), go(rw.unlock)))
+    # queues up behind the waiting writer
+    rw.rlock(lambda: results.append("r2"))
+    go(rw.runlock)
+    run()
+    assert results == ["r1", "w", "r2"] and rw.readers == 1
+
+
+def test_once():
+    once = Once()
+    results = []
+    for _ in range(3):
+        once.do(lambda: results.append(1))
+    assert results == [1]
+
+
+def test_weighted_semaphore():
+    sem = Semaphore(3)
+    results = []
+    sem.acquire(2, lambda: results.append("a"))
+    # the big acquire isn't overtaken by the small one behind it
+    sem.acquire(3, lambda: (results.append("b"), go(sem.release, 3)))
+    sem.acquire(1, lambda: results.append("c"))
+    assert not sem.try_acquire(1)
+    go(sem.release, 2)
+    run()
+    assert results == ["a", "b", "c"]
+
+
+def test_deadlock_on_mutex():
+    mu = Mutex()
+    mu.lock(None)
+
+    def forgotten_unlock():
+        mu.lock(lambda: None)
+
+    go(forgotten_unlock)
+    try:
+        run()
+    except Deadlock as e:
+        assert e.blocked == [("lock", mu, e.blocked[0][2])]
+    else:
+        assert False, "expected a deadlock"
@@ -0,0 +1,106 @@
+import time
+from . import Deadlock, after, after_func, go, make, recv, run, scheduler, select, ticker, timer
+
+
+def test_select_timeout():
+    ch = make()
+    results = []
+    select([
+        (recv, ch, lambda value, ok: results.append("received")),
+        (recv, after(0.01), lambda now, ok: results.append("timeout")),
+    ])
+    run()
+    assert results == ["timeout"]
+    # the timed out select doesn't leave a waiter behind
+    assert not ch.waiting_to_recv
+
+
+def test_timers_fire_in_order():
+    results = []
+    for seconds in [0.03, 0.01, 0.02]:
+        after_func(seconds, lambda seconds=seconds: results.append(seconds))
+    run()
+    assert results == [0.01, 0.02, 0.03]
+
+
+def test_stop():
+    t = timer(0.01)
+    results = []
+    recv(t.channel, lambda now, ok: results.append(now))
+    assert t.stop()
+    assert not t.stop()
+    t.reset(0.01)
+    run()
+    assert len(results) == 1
+
+
+def test_ticker():
+    t = ticker(0.005)
+    ticks = []
+
+    def tick(now, ok):
+        ticks.append(now)
+        if len(ticks) < 3:
+            recv(t.channel, tick)
+        else:
+            t.stop()
+
+    go(recv, t.channel, tick)
+    run()
+    assert len(ticks) == 3
+    assert ticks == sorted(ticks)
+
+
+def test_run_ignores_timers_nobody_waits_for():
+    start = time.monotonic()
+    after(10)
+    go(lambda: None)
+    run()
+    assert time.monotonic() - start < 1
+
+
+def test_failed_run_leaves_no_timers():
+    fired = []
+
+    def fail():
+        after_func(0, lambda: fired.append("failed"))
+        raise ValueError("fail")
+
+    go(fail)
+    try:
+        run()
+    except ValueError:
+        pass
+    else:
+        assert False, "run didn't fail"
+
+    ch = make()
+    # nobody waits for it, so it doesn't hold off the deadlock
+    t = timer(0.001)
+    recv(ch, lambda value, ok: None)
+    try:
+        run()
+    except Deadlock:
+        pass
+    else:
+        assert False, "no deadlock"
+    assert not t.stop()
+
+    run()
+    assert fired == []
+
+
+def test_timers_count_what_they_can_wake():
+    t = timer(10)
+    ch = make()
+    select([
+        (recv, ch, lambda value, ok: None),
+        (recv, t.channel, lambda now, ok: None),
+    ])
+    assert scheduler.timers.wakers == 1
+    t.stop()
+    assert scheduler.timers.wakers == 0
+    t.reset(0.001)
+    assert scheduler.timers.wakers == 1
+    run()
+    assert scheduler.timers.wakers == 0
@@ -1,57 +1,586 @@
-from random import randint
+from collections import deque
+from contextvars import ContextVar
+from random import Random
+from time import perf_counter_ns as clock
 import builtins
 import asyncio
+import heapq
+import itertools
+import weakref
 
 
-class WaitingQueue(list):
-    def enqueue(self, x):
-        self.append(x)
+PENDING, DONE, FAILED, CANCELLED = range(4)
 
-    def dequeue(self, x=None):
-        if x is None:
-            x = self.pop(0)
+
+class Waiter:
+    # A goroutine parked on a channel, which is also what it awaits. It has
+    # the parts of the asyncio.Future interface a Task needs to await it,
+    # and waking it up schedules the task's wake up with call_soon, so
+    # parking doesn't allocate a Future. Once a send or recv is done with
+    # its waiter it goes back on the free list to be reused.
+    __slots__ = ("item", "live", "queue", "selection", "since", "state", "value",
+                 "loop", "callback", "context", "_asyncio_future_blocking")
+
+    def __init__(self, item, selection=None):
+        self.item = item
+        self.live = True
+        # the WaitingQueue it is parked in, or the Selection it is the
+        # future of, if any
+        self.queue = None
+        # set when the waiter is one of the cases of a blocked select, which
+        # await their selection's future instead
+        self.selection = selection
+        self.state = PENDING
+        # the result, or the exception to raise
+        self.value = None
+        self.loop = None
+        self.callback = None
+        self.context = None
+        self._asyncio_future_blocking = False
+
+    def wake(self, value):
+        if self.selection is not None:
+            self.selection.future.wake(value)
+        elif self.state == PENDING:
+            self.state = DONE
+            self.value = value
+            self.schedule()
+
+    def fail(self, exception):
+        if self.selection is not None:
+            self.selection.future.fail(exception)
+        elif self.state == PENDING:
+            self.state = FAILED
+            self.value = exception
+            self.schedule()
+
+    def schedule(self):
+        callback = self.callback
+        if callback is not None:
+            self.callback = None
+            self.loop.call_soon(callback, self, context=self.context)
+
+    def __await__(self):
+        if self.state == PENDING:
+            self.loop = asyncio.get_running_loop()
+            self._asyncio_future_blocking = True
+            yield self
+        return self.result()
+
+    # the rest of the interface a Task uses
+
+    def get_loop(self):
+        return self.loop
+
+    def add_done_callback(self, callback, *, context=None):
+        self.callback = callback
+        self.context = context
+        if self.state != PENDING:
+            self.schedule()
+
+    def remove_done_callback(self, callback):
+        if self.callback is callback:
+            self.callback = None
+            return 1
+        return 0
+
+    def done(self):
+        return self.state != PENDING
+
+    def cancelled(self):
+        return self.state == CANCELLED
+
+    def cancel(self, msg=None):
+        if self.state != PENDING:
+            return False
+        self.state = CANCELLED
+        self.value = msg
+        # it leaves its queue right away rather than once the task resumes,
+        # so nothing is handed to it in between and lost
+        if self.queue is not None:
+            self.queue.cancel(self)
+        self.schedule()
+        return True
+
+    def result(self):
+        if self.state == DONE:
+            return self.value
+        if self.state == FAILED:
+            raise self.value
+        if self.state == CANCELLED:
+            raise asyncio.CancelledError(self.value)
+        raise asyncio.InvalidStateError("result is not ready")
+
+    def exception(self):
+        if self.state == CANCELLED:
+            raise asyncio.CancelledError(self.value)
+        return self.value if self.state == FAILED else None
+
+
+# waiters that are free to be reused, see release
+free = []
+free_max = 1024
+
+
+def release(waiter):
+    # only called once nothing refers to the waiter any more: it was
+    # dequeued and the goroutine that awaited it has resumed
+    if builtins.len(free) < free_max:
+        waiter.item = None
+        waiter.live = True
+        waiter.queue = None
+        waiter.state = PENDING
+        waiter.value = None
+        waiter.context = None
+        free.append(waiter)
+
+
+class WaitingQueue:
+    # once more than this many cancelled waiters are left in the deque (and
+    # they outnumber the live ones) it is rebuilt without them
+    compact_threshold = 64
+
+    __slots__ = ("waiters", "live", "dead", "parks", "waited", "blocked")
+
+    def __init__(self, channel, op):
+        self.waiters = deque()
+        self.live = 0
+        self.dead = 0
+        # how many waiters were woken up, and how long they were parked for
+        self.parks = 0
+        self.waited = 0
+        # what a goroutine parked here is blocked on
+        self.blocked = (op, channel)
+
+    def __len__(self):
+        return self.live
+
+    def enqueue(self, x, selection=None):
+        if free:
+            waiter = free.pop()
+            waiter.item = x
+            waiter.selection = selection
         else:
-            # attempt to remove the passed in item from the queue
-            idx = self.index(x)
-            if idx is not None:
-                self.pop(idx)
+            waiter = Waiter(x, selection)
+        waiter.queue = self
+        waiter.since = clock()
+        self.waiters.append(waiter)
+        self.live += 1
+        # a select parks once for all of its cases, see select
+        if selection is None:
+            park(waiter, *self.blocked)
+        if tracer is not None:
+            tracer.record("park", running_task(), self.blocked[1], (self.blocked[0], waiter))
+        return waiter
+
+    def push_front(self, x):
+        # queues x ahead of the rest with a waiter no goroutine is parked
+        # on, see give_back. Its queue is left unset, which is how close
+        # tells it from a parked sender.
+        waiter = Waiter(x)
+        waiter.since = clock()
+        self.waiters.appendleft(waiter)
+        self.live += 1
+
+    def dequeue(self):
+        # cancelled waiters are skipped lazily
+        popleft = self.waiters.popleft
+        waiter = popleft()
+        while not waiter.live:
+            self.dead -= 1
+            waiter = popleft()
+        waiter.live = False
+        self.live -= 1
+        self.parks += 1
+        self.waited += clock() - waiter.since
+        if tracer is not None:
+            tracer.record("unpark", running_task(), self.blocked[1], waiter)
+        if waiter.selection is not None:
+            waiter.selection.fire(waiter)
+        else:
+            unpark(waiter)
+        return waiter
+
+    def cancel(self, waiter):
+        # attempt to remove the waiter from the queue, returning None if it
+        # was already dequeued or cancelled. Its item can be None, so it
+        # returns the waiter.
+        if not waiter.live:
+            return None
+        waiter.live = False
+        self.live -= 1
+        self.dead += 1
+        if waiter.selection is None:
+            unpark(waiter)
+        channel = self.blocked[1]
+        if channel.watchers:
+            notify_watchers(channel)
+        if tracer is not None:
+            tracer.record("unpark", running_task(), channel, waiter)
+        if self.dead > self.compact_threshold and self.dead > self.live:
+            self.waiters = deque(w for w in self.waiters if w.live)
+            self.dead = 0
+        return waiter
+
+
+class NoWaiters:
+    # Stands in for a channel's WaitingQueue until a goroutine parks on it.
+    # Plenty of channels never have anything parked on one side of them, or
+    # on either, and so never need the queue and its deque.
+    __slots__ = ()
+
+    waiters = ()
+    # for stats
+    parks = 0
+    waited = 0
+
+    def __len__(self):
+        return 0
+
+
+no_waiters = NoWaiters()
+
+
+class RingBuffer:
+    # fixed capacity FIFO, slots are preallocated so pushing and popping
+    # never allocates
+    __slots__ = ("slots", "head", "size", "pushes", "high_water")
+
+    def __init__(self, capacity):
+        self.slots = [None] * capacity
+        self.head = 0
+        self.size = 0
+        # for stats
+        self.pushes = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, x):
+        slots = self.slots
+        i = self.head + self.size
+        if i >= builtins.len(slots):
+            i -= builtins.len(slots)
+        slots[i] = x
+        self.size += 1
+        self.pushes += 1
+        if self.size > self.high_water:
+            self.high_water = self.size
+
+    def push_front(self, x):
+        # puts x ahead of the rest. If the buffer is full this displaces
+        # its last value, which is returned.
+        slots = self.slots
+        head = self.head - 1
+        if head < 0:
+            head += builtins.len(slots)
+        displaced = slots[head]
+        slots[head] = x
+        self.head = head
+        if self.size < builtins.len(slots):
+            self.size += 1
+        return displaced
+
+    def pop(self):
+        slots = self.slots
+        head = self.head
+        x = slots[head]
+        # drop the reference so the value can be collected
+        slots[head] = None
+        head += 1
+        if head == builtins.len(slots):
+            head = 0
+        self.head = head
+        self.size -= 1
         return x
 
 
+# unbuffered channels never push to their buffer, so they all share this one
+unbuffered = RingBuffer(0)
+
+
+class Deadlock(Exception):
+    def __init__(self, blocked):
+        # what every goroutine was blocked on, as (op, channel, goroutine)
+        self.blocked = blocked
+        lines = ["fatal error: all goroutines are asleep - deadlock"]
+        for op, channel, goroutine in blocked:
+            name = getattr(goroutine, "__qualname__", None) or repr(goroutine)
+            on = "nil channel" if channel is None else repr(channel)
+            lines.append(f"goroutine {name} [{op} on {on}]")
+        super().__init__("\n".join(lines))
+
+
 class Channel:
+    __slots__ = ("capacity", "buffer", "closed", "waiting_to_send", "waiting_to_recv",
+                 "watchers", "handoffs", "select_wins")
+
     def __init__(self, capacity):
         self.capacity = capacity
-        self.buffer = []
+        self.buffer = RingBuffer(capacity) if capacity else unbuffered
         self.closed = False
-        self.waiting_to_send = WaitingQueue()
-        self.waiting_to_recv = WaitingQueue()
+        # see send_queue and recv_queue
+        self.waiting_to_send = no_waiters
+        self.waiting_to_recv = no_waiters
+        # select sets watching this channel
+        self.watchers = None
+        # values passed straight from a sender to a receiver, the rest go
+        # through the buffer
+        self.handoffs = 0
+        # selects that chose a case on this channel
+        self.select_wins = 0
+
+    def send_queue(self):
+        # the queue of blocked senders, made when the first one parks
+        if self.waiting_to_send is no_waiters:
+            self.waiting_to_send = WaitingQueue(self, "send")
+        return self.waiting_to_send
+
+    def recv_queue(self):
+        if self.waiting_to_recv is no_waiters:
+            self.waiting_to_recv = WaitingQueue(self, "recv")
+        return self.waiting_to_recv
+
+    def __aiter__(self):
+        # "for value := range channel"
+        return ChannelIterator(self)
+
+
+class Stats:
+    # a snapshot of a channel's counters, see stats. Times are in
+    # nanoseconds and only count parked goroutines that were woken up.
+    __slots__ = ("capacity", "len", "sends", "recvs", "handoffs", "buffered",
+                 "high_water", "select_wins", "send_parks", "send_wait",
+                 "recv_parks", "recv_wait")
+
+    def __init__(self, channel):
+        buffer = channel.buffer
+        self.capacity = channel.capacity
+        self.len = buffer.size
+        self.handoffs = channel.handoffs
+        self.buffered = buffer.pushes
+        self.sends = self.handoffs + self.buffered
+        self.recvs = self.sends - buffer.size
+        self.high_water = buffer.high_water
+        self.select_wins = channel.select_wins
+        self.send_parks = channel.waiting_to_send.parks
+        self.send_wait = channel.waiting_to_send.waited
+        self.recv_parks = channel.waiting_to_recv.parks
+        self.recv_wait = channel.waiting_to_recv.waited
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)}" for name in self.__slots__)
+        return f"Stats({fields})"
 
 
 # Scheduling Methods
 
-def go(task):
+class Scheduler:
+    # Keeps track of the goroutines started with go() under run() and of
+    # the ones that are parked on a channel. Once every goroutine is parked
+    # nothing can wake them up again, so the deadlock future is failed.
+
+    def __init__(self):
+        self.goroutines = set()
+        # the task running the main coroutine, see supervise
+        self.main = None
+        # maps the waiter (or selection) a goroutine parked on to
+        # (op, channel, task)
+        self.parked = {}
+        self.deadlock = asyncio.get_running_loop().create_future()
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        # the set also keeps the task alive while it is parked
+        self.goroutines.add(task)
+        task.add_done_callback(self.exit)
+        return task
+
+    def exit(self, task):
+        self.goroutines.discard(task)
+        if task is self.main:
+            # the goroutines left behind can't deadlock the program any more
+            self.deadlock.cancel()
+        self.check()
+
+    def park(self, record, op, channel):
+        task = asyncio.current_task()
+        if task in self.goroutines:
+            self.parked[record] = (op, channel, task)
+            self.check()
+
+    def check(self):
+        if self.deadlock.done():
+            return
+        if self.goroutines and builtins.len(self.parked) == builtins.len(self.goroutines):
+            timers = wheels.get(self.deadlock.get_loop())
+            if timers is not None and timers.waking():
+                # a timer can still wake one of them up
+                return
+            self.deadlock.set_exception(Deadlock(self.blocked()))
+
+    def blocked(self):
+        return [(op, channel, task.get_coro()) for op, channel, task in self.parked.values()]
+
+
+# the scheduler of the run() call we are in, if any
+current = ContextVar("scheduler", default=None)
+
+
+def park(record, op, channel):
+    scheduler = current.get()
+    if scheduler is not None:
+        scheduler.park(record, op, channel)
+
+
+def unpark(record):
+    scheduler = current.get()
+    if scheduler is not None:
+        scheduler.parked.pop(record, None)
+
+
+# tasks started with go() outside of run(), the event loop only keeps weak
+# references to them
+tasks = set()
+
+
+def go(task, ctx=None):
+    # Starts the coroutine as a goroutine and returns its task. If it's
+    # given a context the goroutine is cancelled along with it.
     if task:
-        asyncio.create_task(task)
+        coro = task
+        scheduler = current.get()
+        if scheduler is not None:
+            task = scheduler.spawn(coro)
+        else:
+            task = asyncio.create_task(coro)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if ctx is not None:
+            ctx.track(task)
+        if tracer is not None:
+            tracer.record("go", running_task(), None, coro)
+        return task
+
+
+async def supervise(main):
+    scheduler = Scheduler()
+    current.set(scheduler)
+    task = scheduler.main = scheduler.spawn(main)
+    await asyncio.wait([task, scheduler.deadlock], return_when=asyncio.FIRST_COMPLETED)
+    if task.done():
+        # "Program execution ... does not wait for other (non-main)
+        # goroutines to complete."
+        return task.result()
+    for goroutine in scheduler.goroutines:
+        goroutine.cancel()
+    raise scheduler.deadlock.exception()
+
+
+def new_event_loop(uvloop=False):
+    # uvloop's event loop if it's asked for and installed, asyncio's if not
+    if uvloop:
+        try:
+            import uvloop as module
+        except ImportError:
+            pass
+        else:
+            return module.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def run(main, uvloop=False):
+    # Runs the main coroutine like asyncio.run, but raises Deadlock if it
+    # and every goroutine it started end up blocked forever. Goroutines
+    # started with asyncio directly aren't tracked.
+    with asyncio.Runner(loop_factory=lambda: new_event_loop(uvloop)) as runner:
+        return runner.run(supervise(main))
+
+
+# picks among the ready cases of a select, see seed
+rng = Random()
+turns = itertools.count()
+
+
+def seed(a=None):
+    # selects choose the same cases again after the same seed, to make
+    # test and benchmark runs reproducible
+    global turns
+    rng.seed(a)
+    turns = itertools.count()
+
+
+# Tracing
+
+# where events are recorded while tracing, see start_trace
+tracer = None
+
+
+def start_trace(capacity=None):
+    # record events until stop_trace, keeping the last `capacity` of them
+    # (tracing.CAPACITY by default). tracing is only imported once it's
+    # used, so the runtime works without it.
+    import tracing
+    global tracer
+    tracer = tracing.Tracer(tracing.CAPACITY if capacity is None else capacity)
+    return tracer
+
+
+def stop_trace():
+    global tracer
+    stopped, tracer = tracer, None
+    return stopped
+
+
+def running_task():
+    # close can be called from outside the event loop
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+async def block_forever(op, channel=None):
+    record = Waiter(None)
+    park(record, op, channel)
+    try:
+        await record
+    finally:
+        unpark(record)
 
 
 # Channel Methods
 
-def make(capacity=0):
+def make(capacity=0, dtype=None):
+    # with a dtype the buffer is a typed array, see arrays
+    if dtype is not None:
+        from .arrays import ArrayChannel
+        return ArrayChannel(capacity, dtype)
     return Channel(capacity)
 
 
 def len(channel):
-    return builtins.len(channel.buffer)
+    return channel.buffer.size
 
 
 def cap(channel):
     return channel.capacity
 
 
+def stats(channel):
+    return Stats(channel)
+
+
 async def send(channel, value):
     # "A send on a nil channel blocks forever."
     if channel is None:
-        await asyncio.Future()
+        await block_forever("send")
+
+    if channel.watchers:
+        notify_watchers(channel)
+    if tracer is not None:
+        tracer.record("send", running_task(), channel, channel.buffer.size)
 
     # "A send on a closed channel proceeds by causing a run-time panic."
     if channel.closed:
@@ -59,24 +588,33 @@ async def send(channel, value):
 
     # "A send on an unbuffered channel can proceed if a receiver is ready."
     if channel.waiting_to_recv:
-        future = channel.waiting_to_recv.dequeue()
-        future.set_result((value, True))
+        channel.handoffs += 1
+        channel.waiting_to_recv.dequeue().wake((value, True))
         return
 
     # "A send on a buffered channel can proceed if there is room in the buffer."
     if len(channel) < cap(channel):
-        channel.buffer.append(value)
+        channel.buffer.push(value)
         return
 
-    future = asyncio.Future()
-    channel.waiting_to_send.enqueue((value, future))
-    await future
+    waiter = channel.send_queue().enqueue(value)
+    try:
+        await waiter
+    except asyncio.CancelledError:
+        channel.waiting_to_send.cancel(waiter)
+        raise
+    release(waiter)
 
 
 async def recv(channel):
     # "Receiving from a nil channel blocks forever."
     if channel is None:
-        await asyncio.Future()
+        await block_forever("recv")
+
+    if channel.watchers:
+        notify_watchers(channel)
+    if tracer is not None:
+        tracer.record("recv", running_task(), channel, channel.buffer.size)
 
     # if there is a value in the buffer, receive it
     if len(channel) > 0:
@@ -85,13 +623,21 @@ async def recv(channel):
         # For example, if one goroutine sends values on a channel and
         # a second goroutine receives them,
         # the values are received in the order sent. "
-        value = channel.buffer.pop(0)
+        value = channel.buffer.pop()
+        # the freed slot goes to the first blocked sender, so its value
+        # stays ahead of anything sent later
+        if channel.waiting_to_send:
+            sender = channel.waiting_to_send.dequeue()
+            channel.buffer.push(sender.item)
+            sender.wake(None)
         return value, True
 
     # "if anything is currently blocked on sending for this channel, receive it"
     if channel.waiting_to_send:
-        value, future = channel.waiting_to_send.dequeue()
-        future.set_result(None)
+        channel.handoffs += 1
+        sender = channel.waiting_to_send.dequeue()
+        value = sender.item
+        sender.wake(None)
         return value, True
 
     # "A receive operation on a closed channel can always proceed immediately,
@@ -99,10 +645,37 @@ async def recv(channel):
     if channel.closed:
         return None, False
 
-    future = asyncio.Future()
-    channel.waiting_to_recv.enqueue(future)
-    value, ok = await future
-    return value, ok
+    waiter = channel.recv_queue().enqueue(None)
+    try:
+        result = await waiter
+    except asyncio.CancelledError:
+        channel.waiting_to_recv.cancel(waiter)
+        if waiter.state == DONE and waiter.value[1]:
+            # it was handed a value before it was cancelled
+            give_back(channel, waiter.value[0])
+        raise
+    release(waiter)
+    return result
+
+
+def give_back(channel, value):
+    # A receiver that was handed a value got cancelled before it could
+    # return it. The sender is long gone, so the value goes back to the
+    # front of the channel for the next receiver.
+    if channel.watchers:
+        notify_watchers(channel)
+    if channel.waiting_to_recv:
+        channel.handoffs += 1
+        channel.waiting_to_recv.dequeue().wake((value, True))
+        return
+    if channel.capacity:
+        full = channel.buffer.size == channel.capacity
+        displaced = channel.buffer.push_front(value)
+        if not full:
+            return
+        value = displaced
+    # it waits ahead of the blocked senders, like their values do
+    channel.send_queue().push_front(value)
 
 
 def close(channel):
@@ -110,17 +683,111 @@ def close(channel):
     if channel.closed:
         raise Exception("close of closed channel")
 
+    if channel.watchers:
+        notify_watchers(channel)
+    if tracer is not None:
+        tracer.record("close", running_task(), channel)
+
     channel.closed = True
 
-    # complete any senders
+    # complete any senders. Values given back to the channel were sent
+    # already, so they stay queued for the receivers.
+    given_back = []
     while channel.waiting_to_send:
-        _, future = channel.waiting_to_send.dequeue()
-        future.set_exception(Exception("send on closed channel"))
+        sender = channel.waiting_to_send.dequeue()
+        if sender.queue is None:
+            given_back.append(sender.item)
+        else:
+            sender.fail(Exception("send on closed channel"))
+    for value in reversed(given_back):
+        channel.waiting_to_send.push_front(value)
 
     # complete any receivers
     while channel.waiting_to_recv:
-        future = channel.waiting_to_recv.dequeue()
-        future.set_result((None, False))
+        channel.waiting_to_recv.dequeue().wake((None, False))
+
+
+# Batch Methods
+
+def take(channel, n):
+    # receive up to n values that are available without blocking
+    if channel.watchers:
+        notify_watchers(channel)
+    if tracer is not None:
+        tracer.record("recv", running_task(), channel, channel.buffer.size)
+
+    values = []
+    buffer = channel.buffer
+    senders = channel.waiting_to_send
+    while n > 0:
+        if buffer.size:
+            values.append(buffer.pop())
+            if senders:
+                sender = senders.dequeue()
+                buffer.push(sender.item)
+                sender.wake(None)
+        elif senders:
+            channel.handoffs += 1
+            sender = senders.dequeue()
+            values.append(sender.item)
+            sender.wake(None)
+        else:
+            break
+        n -= 1
+    return values
+
+
+async def send_many(channel, values):
+    if channel is not None and channel.watchers:
+        notify_watchers(channel)
+    if channel is not None and tracer is not None:
+        tracer.record("send", running_task(), channel, channel.buffer.size)
+
+    for value in values:
+        if channel is not None and not channel.closed:
+            if channel.waiting_to_recv:
+                channel.handoffs += 1
+                channel.waiting_to_recv.dequeue().wake((value, True))
+                continue
+            if channel.buffer.size < channel.capacity:
+                channel.buffer.push(value)
+                continue
+        # block (or panic) on this one, just like send
+        await send(channel, value)
+        if channel.watchers:
+            notify_watchers(channel)
+
+
+async def recv_many(channel, max_n):
+    if channel is not None:
+        values = take(channel, max_n)
+        if values:
+            return values, True
+
+    value, ok = await recv(channel)
+    if not ok:
+        return [], False
+    values = [value]
+    values += take(channel, max_n - 1)
+    return values, True
+
+
+class ChannelIterator:
+    # receives one value per step of `async for`, so whatever is left when
+    # the loop stops early stays on the channel
+    __slots__ = ("channel",)
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        value, ok = await recv(self.channel)
+        if not ok:
+            raise StopAsyncIteration
+        return value
 
 
 # Selection
@@ -128,67 +795,525 @@ def close(channel):
 # used to indicate the default case in a select
 default = object()
 
+# How a select picks among the cases that are ready: at random like Go,
+# taking turns, or always the first one in the order they're listed. Only
+# a SelectSet keeps track of whose turn it is. Selects on plain lists of
+# cases take turns through one counter they all share, which is only fair
+# as long as a single select is taking turns.
+RANDOM = "random"
+ROUND_ROBIN = "round_robin"
+PRIORITY = "priority"
 
-async def select(cases):
-    # block forever
-    if builtins.len(cases) == 0:
-        await asyncio.Future()
 
-    def is_ready(case):
-        if case[0] == send:
-            return case[1].closed or len(case[1]) < cap(case[1]) or case[1].waiting_to_recv
-        elif case[0] == recv:
-            return case[1].closed or len(case[1]) > 0 or case[1].waiting_to_send
-        elif case[0] == default:
-            return False
+def can_send(channel):
+    return channel.closed or channel.waiting_to_recv or len(channel) < cap(channel)
+
+
+def can_recv(channel):
+    return channel.closed or len(channel) > 0 or channel.waiting_to_send
+
+
+def notify_watchers(channel):
+    # the channel's state is about to change, so any select set watching it
+    # has to re-check its cases on that channel
+    for selectset in channel.watchers:
+        selectset.dirty.add(channel)
+
+
+class SelectSet:
+    # A select whose cases are compiled once so it can be re-entered in a
+    # loop. Channels mark it dirty when their state changes, so each select
+    # only re-checks the channels that changed since the last one.
+
+    def __init__(self, cases, policy=RANDOM):
+        self.cases = []
+        self.default = None
+        self.policy = policy
+        # where the next round robin pick starts looking
+        self.turn = 0
+        self.channels = {}
+        for case in cases:
+            if case[0] is default:
+                self.default = case
+                continue
+            self.cases.append(case)
+            channel = case[1]
+            # cases on a nil channel are never ready
+            if channel is None:
+                continue
+            if channel not in self.channels:
+                self.channels[channel] = []
+                if channel.watchers is None:
+                    channel.watchers = []
+                channel.watchers.append(self)
+            self.channels[channel].append(builtins.len(self.cases) - 1)
+        self.ready = set()
+        self.dirty = set(self.channels)
+
+    def poll(self):
+        # bring the set of ready cases up to date
+        cases, ready = self.cases, self.ready
+        for channel in self.dirty:
+            for i in self.channels[channel]:
+                if can_send(channel) if cases[i][0] is send else can_recv(channel):
+                    ready.add(i)
+                else:
+                    ready.discard(i)
+        self.dirty.clear()
+        return ready
+
+    def pick(self):
+        # one of the ready cases by the set's policy, or the default case
+        ready = self.poll()
+        if not ready:
+            return self.default
+        policy = self.policy
+        if policy is PRIORITY:
+            i = min(ready)
+        elif policy is ROUND_ROBIN:
+            i = min((j for j in ready if j >= self.turn), default=None)
+            if i is None:
+                i = min(ready)
+            self.turn = i + 1
+        elif builtins.len(ready) == 1:
+            i = next(iter(ready))
+        else:
+            n = int(rng.random() * builtins.len(ready))
+            i = next(itertools.islice(ready, n, None))
+        return self.cases[i]
+
+    def close(self):
+        # stop watching the channels
+        for channel in self.channels:
+            channel.watchers.remove(self)
+        self.channels = {}
+        self.cases = []
+        self.ready.clear()
+        self.dirty.clear()
 
-    # first see if any of the cases are ready to proceed
-    ready = [case for case in cases if is_ready(case)]
-    if ready:
-        # pick a random one
-        case = ready[randint(0, builtins.len(ready)-1)]
-        if case[0] == send:
+
+class Selection:
+    # the waiters a blocked select left on its channels, they all share one
+    # future and once one of them is dequeued the rest are cancelled
+    __slots__ = ("future", "waiters", "fired")
+
+    def __init__(self):
+        # a Waiter rather than a Future, so cancelling the select takes its
+        # cases off their queues right away, like a parked send or recv
+        self.future = Waiter(None)
+        self.future.queue = self
+        self.waiters = []
+        # the case that was chosen
+        self.fired = None
+
+    def fire(self, waiter):
+        unpark(self)
+        for case, queue, other in self.waiters:
+            if other is waiter:
+                self.fired = case
+            else:
+                queue.cancel(other)
+
+    def cancel(self, future=None):
+        unpark(self)
+        for case, queue, waiter in self.waiters:
+            queue.cancel(waiter)
+
+
+def trace_select(cases, case):
+    # the default case isn't in a SelectSet's cases
+    index = cases.index(case) if case in cases else -1
+    tracer.record("select", running_task(), case[1] if case[0] is not default else None, index)
+
+
+def pick(cases, policy):
+    # one of the ready cases by the policy, or else the default case if
+    # there is one
+    if policy is ROUND_ROBIN and cases:
+        # the turn is shared with every other select, see ROUND_ROBIN
+        turn = next(turns) % builtins.len(cases)
+        cases = itertools.chain(cases[turn:], cases[:turn])
+    # the list of ready cases is only made once there are two of them
+    first = ready = fallback = None
+    for c in cases:
+        if c[0] is send:
+            if c[1] is None or not can_send(c[1]):
+                continue
+        elif c[0] is recv:
+            if c[1] is None or not can_recv(c[1]):
+                continue
+        else:
+            fallback = c
+            continue
+        if policy is not RANDOM:
+            return c
+        if first is None:
+            first = c
+        elif ready is None:
+            ready = [first, c]
+        else:
+            ready.append(c)
+    if ready is not None:
+        return ready[int(rng.random() * builtins.len(ready))]
+    return first or fallback
+
+
+async def select(cases, policy=RANDOM):
+    # first see if any of the cases are ready to proceed, a SelectSet
+    # picks by its own policy
+    if isinstance(cases, SelectSet):
+        case = cases.pick()
+        cases = cases.cases
+    else:
+        case = pick(cases, policy)
+
+    if case is not None:
+        if tracer is not None:
+            trace_select(cases, case)
+        if case[0] is send:
+            case[1].select_wins += 1
             await send(case[1], case[2])
             await case[3]()
-        elif case[0] == recv:
+        elif case[0] is recv:
+            case[1].select_wins += 1
             value, ok = await recv(case[1])
             await case[2](value, ok)
+        else:
+            # there's a default case and nothing else is ready
+            await case[1]()
         return
 
-    # next see if there's a default case
-    defaults = [case for case in cases if case[0] == default]
-    if defaults:
-        await defaults[0]()
-        return
-
-    # finally we will enqueue each case into the waiting queues
-    # we also update each callback so it will cleanup all the
-    # other cases so only one is fired
+    # finally we will enqueue each case into the waiting queues, all of
+    # them resolve the same future and whichever is dequeued first cancels
+    # the others
 
-    futures = []
+    selection = Selection()
     for case in cases:
-        future = asyncio.Future()
-        if case[0] == send:
-            case[1].waiting_to_send.enqueue((case[2], future))
-        elif case[0] == recv:
-            case[1].waiting_to_recv.enqueue(future)
-
-    # wait for one to complete
-    done, _ = asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
-
-    # remove the others
-    for i, case in enumerate(cases):
-        future = futures[i]
-        if case[0] == send:
-            case[1].waiting_to_send.dequeue((case[2], future))
-        elif case[0] == recv:
-            case[1].waiting_to_recv.dequeue(future)
-
-    for i, future in enumerate(futures):
-        if future == done[0]:
-            if cases[i][0] == send:
-                await future
-                await cases[i][3]()
-            elif cases[i][0] == recv:
-                value, ok = await future
-                await cases[i][2](value, ok)
+        channel = case[1]
+        if channel is None:
+            continue
+        if channel.watchers:
+            notify_watchers(channel)
+        if case[0] is send:
+            queue = channel.send_queue()
+            waiter = queue.enqueue(case[2], selection)
+        else:
+            queue = channel.recv_queue()
+            waiter = queue.enqueue(None, selection)
+        selection.waiters.append((case, queue, waiter))
+
+    # "a select with no cases (or only nil channels) blocks forever",
+    # as nothing can resolve the future
+    park(selection, "select", tuple(case[1] for case in cases if case[1] is not None) or None)
+    try:
+        result = await selection.future
+    except asyncio.CancelledError:
+        selection.cancel()
+        future, case = selection.future, selection.fired
+        if case is not None and case[0] is recv and not future.cancelled() and future.result()[1]:
+            # it was handed a value before it was cancelled
+            give_back(case[1], future.result()[0])
+        raise
+
+    case = selection.fired
+    case[1].select_wins += 1
+    if tracer is not None:
+        trace_select(cases, case)
+    if case[0] is send:
+        await case[3]()
+    else:
+        value, ok = result
+        await case[2](value, ok)
+
+
+# Timers
+
+class Timers:
+    # A heap of pending timers ordered by deadline, one per event loop. Only
+    # the earliest deadline is scheduled with the loop (and rescheduled as
+    # it changes), so each pending timer costs O(log n) rather than a loop
+    # callback of its own. Stopped timers are left in the heap with their
+    # entry blanked out and skipped once they reach the top.
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.heap = []
+        self.counter = itertools.count()
+        # timers in the heap that weren't stopped
+        self.live = 0
+        # what could still wake a goroutine up: the callbacks of the timers
+        # in the heap and the goroutines parked on their channels, see
+        # waking
+        self.wakers = 0
+        # the loop callback for the earliest deadline, and that deadline
+        self.handle = None
+        self.armed = None
+
+    def add(self, timer, when):
+        # the counter breaks ties so timers due at the same time fire in
+        # the order they were set
+        entry = [when, next(self.counter), timer]
+        timer.entry = entry
+        heapq.heappush(self.heap, entry)
+        self.live += 1
+        self.wakers += timer.wakers()
+        if self.armed is None or when < self.armed:
+            self.arm()
+
+    def remove(self, timer):
+        entry = timer.entry
+        if entry is None:
+            return False
+        entry[2] = None
+        timer.entry = None
+        self.live -= 1
+        self.wakers -= timer.wakers()
+        return True
+
+    def next(self):
+        # the earliest deadline, or None
+        heap = self.heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def arm(self):
+        when = self.next()
+        if when == self.armed:
+            return
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        self.armed = when
+        if when is not None:
+            self.handle = self.loop.call_at(when, self.expire)
+
+    def expire(self):
+        self.handle = None
+        self.armed = None
+        self.fire(self.loop.time())
+        self.arm()
+        # the goroutines parked on the timers that are left may be stuck
+        scheduler = current.get()
+        if scheduler is not None:
+            scheduler.check()
+
+    def fire(self, now):
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            when, _, timer = heapq.heappop(heap)
+            if timer is None:
+                continue
+            timer.entry = None
+            self.live -= 1
+            self.wakers -= timer.wakers()
+            if timer.interval:
+                # like Go's tickers, one that fell behind drops the ticks it
+                # missed rather than firing them all at once
+                missed = (now - when) // timer.interval
+                self.add(timer, when + (missed + 1) * timer.interval)
+            timer.fire(now)
+
+    def waking(self):
+        # whether a pending timer could still wake a goroutine up: it runs a
+        # callback or someone is parked on its channel
+        return self.wakers > 0
+
+
+# the timers of each running event loop
+wheels = weakref.WeakKeyDictionary()
+
+
+def timers():
+    loop = asyncio.get_running_loop()
+    wheel = wheels.get(loop)
+    if wheel is None:
+        wheel = wheels[loop] = Timers(loop)
+    return wheel
+
+
+class TimerQueue(WaitingQueue):
+    # the receivers parked on a timer's channel, counted in the timers'
+    # wakers while the timer is pending
+    __slots__ = ("timer",)
+
+    def __init__(self, timer):
+        super().__init__(timer.channel, "recv")
+        self.timer = timer
+
+    def enqueue(self, x, selection=None):
+        # counted before it parks, which may check for a deadlock
+        if self.timer.entry is not None:
+            self.timer.timers.wakers += 1
+        return super().enqueue(x, selection)
+
+    def dequeue(self):
+        if self.timer.entry is not None:
+            self.timer.timers.wakers -= 1
+        return super().dequeue()
+
+    def cancel(self, waiter):
+        if waiter.live and self.timer.entry is not None:
+            self.timer.timers.wakers -= 1
+        return super().cancel(waiter)
+
+
+class Timer:
+    # Like Go's time.Timer, `channel` receives the loop's time once the
+    # timer fires. Tickers fire every `interval` seconds and timers made by
+    # after_func start a goroutine instead.
+    __slots__ = ("channel", "interval", "callback", "entry", "timers")
+
+    def __init__(self, seconds, interval=None, callback=None):
+        # "The channel has a buffer of one", so firing never blocks
+        self.channel = Channel(1)
+        self.channel.waiting_to_recv = TimerQueue(self)
+        self.interval = interval
+        self.callback = callback
+        self.entry = None
+        self.timers = timers()
+        self.timers.add(self, self.timers.loop.time() + seconds)
+
+    def fire(self, now):
+        if self.callback is not None:
+            go(self.callback())
+            return
+        channel = self.channel
+        if channel.watchers:
+            notify_watchers(channel)
+        if channel.waiting_to_recv:
+            channel.handoffs += 1
+            channel.waiting_to_recv.dequeue().wake((now, True))
+        elif channel.buffer.size < channel.capacity:
+            channel.buffer.push(now)
+
+    def wakers(self):
+        # what this timer could wake up while it's pending
+        return (self.callback is not None) + builtins.len(self.channel.waiting_to_recv)
+
+    def stop(self):
+        # returns whether the timer was stopped before it fired
+        return self.timers.remove(self)
+
+    def reset(self, seconds):
+        # returns whether the timer was still pending
+        pending = self.timers.remove(self)
+        self.timers.add(self, self.timers.loop.time() + seconds)
+        return pending
+
+
+def timer(seconds):
+    return Timer(seconds)
+
+
+def ticker(seconds):
+    if seconds <= 0:
+        raise ValueError("non-positive interval for ticker")
+    return Timer(seconds, seconds)
+
+
+def after(seconds):
+    # a channel that receives the time after `seconds`, for timeouts:
+    #   await select([(recv, ch, onrecv), (recv, after(1), ontimeout)])
+    return Timer(seconds).channel
+
+
+def after_func(seconds, callback):
+    # callback() is started as a goroutine, so it returns a coroutine
+    return Timer(seconds, callback=callback)
+
+
+# Contexts
+
+class Canceled(Exception):
+    def __init__(self):
+        super().__init__("context canceled")
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self):
+        super().__init__("context deadline exceeded")
+
+
+class Context:
+    # Like Go's context.Context: done() is closed when the context is
+    # cancelled, by cancel(), its deadline or its parent being cancelled.
+    # Cancelling a context also cancels the goroutines started with
+    # go(task, ctx=...) in it, which releases anything they're parked on.
+
+    def __init__(self, parent=None, deadline=None):
+        self.parent = parent
+        self.children = set()
+        self.tasks = set()
+        self.channel = Channel(0)
+        self.error = None
+        self.timer = None
+        if parent is not None and parent.deadline is not None:
+            if deadline is None or parent.deadline < deadline:
+                deadline = parent.deadline
+        self.deadline = deadline
+
+        if parent is not None:
+            if parent.error is not None:
+                self.cancel(parent.error)
+                return
+            parent.children.add(self)
+        if deadline is not None:
+            loop = asyncio.get_running_loop()
+            if deadline <= loop.time():
+                self.cancel(DeadlineExceeded())
+            else:
+                self.timer = Timer(deadline - loop.time(), callback=self.expire)
+
+    def done(self):
+        return self.channel
+
+    def err(self):
+        # None until the context is cancelled, then Canceled or
+        # DeadlineExceeded
+        return self.error
+
+    def track(self, task):
+        if self.error is not None:
+            task.cancel()
+            return
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def cancel(self, error=None):
+        if self.error is not None:
+            return
+        self.error = error or Canceled()
+        close(self.channel)
+        if self.timer is not None:
+            self.timer.stop()
+            self.timer = None
+        if self.parent is not None:
+            self.parent.children.discard(self)
+        for task in self.tasks:
+            task.cancel()
+        self.tasks.clear()
+        children, self.children = self.children, set()
+        for child in children:
+            child.cancel(self.error)
+
+    async def expire(self):
+        self.cancel(DeadlineExceeded())
+
+
+def background():
+    # a context that is never cancelled, the root of a tree of them
+    return Context()
+
+
+def with_cancel(parent):
+    return Context(parent)
+
+
+def with_deadline(parent, deadline):
+    # `deadline` is in terms of the event loop's time()
+    return Context(parent, deadline)
+
+
+def with_timeout(parent, seconds):
+    return Context(parent, asyncio.get_running_loop().time() + seconds)
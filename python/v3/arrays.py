@@ -0,0 +1,195 @@
+"""
+Channels of numbers, buffered in a typed array.
+
+make(capacity, dtype=...) returns a channel whose buffer is a preallocated
+NumPy array used as a ring, rather than a list of Python objects. Without
+NumPy it is an array.array, and dtype is one of its typecodes ("d", "q",
+...) or one of the NumPy names they stand for ("float64", "int64", ...).
+
+send and recv work on it as usual, one value at a time. send_array and
+recv_array move a whole array at once, with a slice copy for each
+contiguous run of the ring instead of a Python call per value:
+
+    ch = make(4096, dtype="float64")
+    await send_array(ch, samples)
+    values, ok = await recv_array(ch, 1024)
+"""
+import array
+from . import Channel, RingBuffer, notify_watchers, recv, send, take
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# what the NumPy names and Python types stand for without NumPy
+TYPECODES = {
+    "int8": "b", "uint8": "B", "int16": "h", "uint16": "H",
+    "int32": "i", "uint32": "I", "int64": "q", "uint64": "Q",
+    "float32": "f", "float64": "d", int: "q", float: "d",
+}
+
+
+if numpy is not None:
+    def dtype_of(dtype):
+        return numpy.dtype(dtype)
+
+    def new(n, dtype):
+        return numpy.zeros(n, dtype)
+
+    def convert(values, dtype):
+        return numpy.asarray(values, dtype).reshape(-1)
+
+    def window(a):
+        # slices of an ndarray are views already
+        return a
+else:
+    def dtype_of(dtype):
+        code = TYPECODES.get(dtype, dtype)
+        if code not in array.typecodes:
+            raise TypeError(f"unsupported dtype {dtype!r} (NumPy isn't installed)")
+        return code
+
+    def new(n, dtype):
+        return array.array(dtype, bytes(n * array.array(dtype).itemsize))
+
+    def convert(values, dtype):
+        if isinstance(values, array.array) and values.typecode == dtype:
+            return values
+        return array.array(dtype, values)
+
+    def window(a):
+        # slices of a memoryview are views, an array's are copies
+        return memoryview(a)
+
+
+class ArrayRing(RingBuffer):
+    # A RingBuffer over a typed array. read and write copy a run of values
+    # with at most two slice assignments, one on each side of the wrap.
+    __slots__ = ("dtype", "window")
+
+    def __init__(self, capacity, dtype):
+        super().__init__(0)
+        self.dtype = dtype
+        self.slots = new(capacity, dtype)
+        self.window = window(self.slots)
+
+    def pop(self):
+        # numbers hold no references, so the slot is left as it is
+        x = self.slots[self.head]
+        head = self.head + 1
+        if head == len(self.slots):
+            head = 0
+        self.head = head
+        self.size -= 1
+        return x
+
+    def write(self, values, start=0):
+        # pushes as many of values[start:] as there is room for, returns
+        # how many it pushed
+        capacity = len(self.slots)
+        n = min(len(values) - start, capacity - self.size)
+        if n <= 0:
+            return 0
+        tail = self.head + self.size
+        if tail >= capacity:
+            tail -= capacity
+        first = min(n, capacity - tail)
+        src = window(values)
+        self.window[tail:tail + first] = src[start:start + first]
+        self.window[:n - first] = src[start + first:start + n]
+        self.size += n
+        self.pushes += n
+        if self.size > self.high_water:
+            self.high_water = self.size
+        return n
+
+    def read(self, n, skip=0):
+        # pops up to n values into a new array, after `skip` slots that
+        # are left for the caller to fill in
+        n = min(n, self.size)
+        out = new(skip + n, self.dtype)
+        capacity = len(self.slots)
+        head = self.head
+        first = min(n, capacity - head)
+        dst = window(out)
+        dst[skip:skip + first] = self.window[head:head + first]
+        dst[skip + first:] = self.window[:n - first]
+        head += n
+        if head >= capacity:
+            head -= capacity
+        self.head = head
+        self.size -= n
+        return out
+
+
+class ArrayChannel(Channel):
+    __slots__ = ()
+
+    def __init__(self, capacity, dtype):
+        super().__init__(0)
+        self.capacity = capacity
+        self.buffer = ArrayRing(capacity, dtype_of(dtype))
+
+
+async def send_array(channel, values):
+    # sends every value, blocking while the buffer is full like send_many
+    buffer = channel.buffer
+    values = convert(values, buffer.dtype)
+    if channel.watchers:
+        notify_watchers(channel)
+
+    i, n = 0, len(values)
+    while i < n:
+        if not channel.closed:
+            # receivers are only parked while the buffer is empty
+            receivers = channel.waiting_to_recv
+            while receivers and i < n:
+                channel.handoffs += 1
+                receivers.dequeue().wake((values[i], True))
+                i += 1
+            i += buffer.write(values, i)
+            if i == n:
+                break
+        # block (or panic) on the next one, just like send
+        await send(channel, values[i])
+        i += 1
+        if channel.watchers:
+            notify_watchers(channel)
+
+
+def drain(channel, n, skip=0):
+    # reads from the buffer and refills it from the blocked senders
+    if channel.watchers:
+        notify_watchers(channel)
+    buffer = channel.buffer
+    values = buffer.read(n, skip)
+    senders = channel.waiting_to_send
+    while senders and buffer.size < channel.capacity:
+        sender = senders.dequeue()
+        buffer.push(sender.item)
+        sender.wake(None)
+    return values
+
+
+async def recv_array(channel, max_n):
+    # up to max_n values as an array, waiting for the first one like
+    # recv_many. Once the channel is closed and drained it returns an
+    # empty array and False.
+    buffer = channel.buffer
+    if buffer.size:
+        return drain(channel, max_n), True
+
+    # the senders blocked on an unbuffered channel
+    values = take(channel, max_n)
+    if not values:
+        value, ok = await recv(channel)
+        if not ok:
+            return new(0, buffer.dtype), False
+        if buffer.size and max_n > 1:
+            # the sender that handed it over went on to fill the buffer
+            values = drain(channel, max_n - 1, skip=1)
+            values[0] = value
+            return values, True
+        values = [value]
+    return convert(values, buffer.dtype), True
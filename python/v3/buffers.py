@@ -0,0 +1,122 @@
+"""
+Channels of bytes that reuse their buffers.
+
+A bytes channel comes with a pool of fixed size bytearray slabs. Producers
+fill a slab in place, with readinto or by copying into it, and send it on.
+Consumers read it through a memoryview and release it back to the pool
+once they're done with it, so streaming any amount of data allocates a
+handful of slabs rather than an object or two per chunk:
+
+    ch = make_bytes(4)
+
+    async def produce(f):
+        while True:
+            slab = ch.pool.get()
+            n = f.readinto(slab.data)
+            if not n:
+                break
+            slab.truncate(n)
+            await send(ch, slab)
+        close(ch)
+
+    async for slab in ch:
+        out.write(slab.data)
+        slab.release()
+
+Once a slab is released its buffer is handed out again, so whatever is
+kept of its data has to be copied first. A slab that is never released is
+left to the garbage collector.
+"""
+from . import Channel, send
+
+# the default slab size
+SIZE = 64 * 1024
+
+
+class Slab:
+    # a buffer of a pool, `data` is a memoryview of the part that's in use
+    __slots__ = ("pool", "buffer", "data")
+
+    def __init__(self, pool, buffer):
+        self.pool = pool
+        self.buffer = buffer
+        self.data = memoryview(buffer)
+
+    def __len__(self):
+        return len(self.data)
+
+    def truncate(self, n):
+        data = self.data
+        self.data = data[:n]
+        data.release()
+
+    def release(self):
+        # hands the buffer back, data can't be used after this
+        if self.buffer is None:
+            raise Exception("release of released slab")
+        self.data.release()
+        self.pool.put(self.buffer)
+        self.buffer = None
+
+
+class BufferPool:
+    # Up to `keep` free buffers of `size` bytes are kept for reuse, the
+    # rest are left to the garbage collector.
+
+    def __init__(self, size=SIZE, keep=64):
+        if size < 1:
+            raise ValueError("buffer size must be positive")
+        self.size = size
+        self.keep = keep
+        self.free = []
+        # for tuning: buffers that were made, and gets that reused one
+        self.allocated = 0
+        self.reused = 0
+
+    def get(self):
+        if self.free:
+            self.reused += 1
+            return Slab(self, self.free.pop())
+        self.allocated += 1
+        return Slab(self, bytearray(self.size))
+
+    def put(self, buffer):
+        if len(self.free) < self.keep:
+            self.free.append(buffer)
+
+
+class BytesChannel(Channel):
+    # a channel of slabs, along with the pool they come from
+    __slots__ = ("pool",)
+
+    def __init__(self, capacity, pool):
+        super().__init__(capacity)
+        self.pool = pool
+
+
+def make_bytes(capacity=0, size=SIZE, pool=None):
+    # channels can share a pool, by default each gets its own
+    return BytesChannel(capacity, pool or BufferPool(size))
+
+
+async def send_bytes(channel, data):
+    # copies data (anything with the buffer protocol) into as many slabs
+    # as it takes and sends them
+    pool = channel.pool
+    with memoryview(data) as view, view.cast("B") as view:
+        for start in range(0, len(view), pool.size):
+            chunk = view[start:start + pool.size]
+            slab = pool.get()
+            slab.data[:len(chunk)] = chunk
+            slab.truncate(len(chunk))
+            chunk.release()
+            await send(channel, slab)
+
+
+async def recv_bytes(channel):
+    # everything until the channel is closed, as one bytes object
+    out = bytearray()
+    async for slab in channel:
+        out += slab.data
+        slab.release()
+    return bytes(out)
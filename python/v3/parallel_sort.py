@@ -0,0 +1,95 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from . import go
+from .sync import WaitGroup
+
+# slices at most this long are sorted sequentially instead of being split
+# between two more goroutines
+CUTOFF = 1 << 15
+
+
+def merge(xs, lo, mid, hi):
+    # merge the sorted runs xs[lo:mid] and xs[mid:hi] in place. list.sort
+    # finds the two runs and merges them in C, galloping through long
+    # stretches, which is several times faster than merging them one
+    # element at a time in Python.
+    if xs[mid - 1] <= xs[mid]:
+        return
+    run = xs[lo:hi]
+    run.sort()
+    xs[lo:hi] = run
+
+
+async def sort_range(xs, lo, hi, cutoff, executor, wg, errors):
+    try:
+        if hi - lo <= cutoff:
+            if executor is None:
+                xs[lo:hi] = sorted(xs[lo:hi])
+            else:
+                loop = asyncio.get_running_loop()
+                xs[lo:hi] = await loop.run_in_executor(executor, sorted, xs[lo:hi])
+        else:
+            mid = (lo + hi) // 2
+            halves = WaitGroup()
+            halves.add(2)
+            go(sort_range(xs, lo, mid, cutoff, executor, halves, errors))
+            go(sort_range(xs, mid, hi, cutoff, executor, halves, errors))
+            await halves.wait()
+            if not errors:
+                merge(xs, lo, mid, hi)
+    except Exception as e:
+        # e.g. a TypeError from comparing elements, parallel_sort raises
+        # the first one
+        errors.append(e)
+    finally:
+        wg.done()
+
+
+async def parallel_sort(xs, cutoff=CUTOFF, executor=None):
+    # Returns a new sorted list. Slices of `cutoff` elements or fewer are
+    # sorted with sorted(), in `executor` (e.g. a ProcessPoolExecutor) if
+    # one is given, and the goroutines above them merge their halves.
+    xs = list(xs)
+    if len(xs) < 2:
+        return xs
+    wg = WaitGroup()
+    wg.add(1)
+    errors = []
+    go(sort_range(xs, 0, len(xs), max(cutoff, 1), executor, wg, errors))
+    await wg.wait()
+    if errors:
+        raise errors[0]
+    return xs
+
+
+def benchmark(n, workers=None):
+    xs = [random.random() for _ in range(n)]
+
+    start = time.perf_counter()
+    expected = sorted(xs)
+    results = [("sorted", time.perf_counter() - start)]
+
+    start = time.perf_counter()
+    result = asyncio.run(parallel_sort(xs))
+    results.append(("parallel_sort", time.perf_counter() - start))
+    assert result == expected
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers) as executor:
+        cutoff = max(n // (workers * 4), 1)
+        start = time.perf_counter()
+        result = asyncio.run(parallel_sort(xs, cutoff, executor))
+        results.append(("parallel_sort (processes)", time.perf_counter() - start))
+    assert result == expected
+
+    return results
+
+
+if __name__ == "__main__":
+    for n in [int(arg) for arg in sys.argv[1:]] or [10 ** 6, 10 ** 7]:
+        for name, seconds in benchmark(n):
+            print(f"{n:>10} {name:<28} {seconds:8.3f}s")
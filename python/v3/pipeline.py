@@ -0,0 +1,356 @@
+"""
+Channel to channel stages for building streaming pipelines.
+
+Each stage takes its input channel(s), starts the goroutines that do the
+work and returns its output channel(s), which are closed once the inputs
+are closed and drained:
+
+    squares = map(lambda x: x * x, source(range(100)))
+    evens = filter(lambda x: x % 2 == 0, squares)
+    print(await collect(evens))
+
+Values move between stages with recv_many and send_many, a batch at a
+time, rather than with one awaited send per value.
+
+A stage that fails closes its outputs all the same, so the stages after it
+finish with what they got, and drains its inputs, so the ones before it
+finish too.
+"""
+import asyncio
+import heapq
+from . import close, go, make, recv, recv_many, select, send, send_many, take, timer
+from .sync import WaitGroup
+
+# the most values a stage takes from its input at once
+BATCH = 64
+
+
+def source(xs, capacity=0):
+    # a channel that receives the values of an iterable
+    out = make(capacity)
+
+    async def run():
+        try:
+            await send_many(out, xs)
+        finally:
+            close(out)
+
+    go(run())
+    return out
+
+
+async def drain(src):
+    # receives and drops everything until the channel is closed, so the
+    # stages before one that failed aren't left blocked
+    while True:
+        values, ok = await recv_many(src, BATCH)
+        if not ok:
+            return
+
+
+async def collect(src):
+    # receives everything until the channel is closed
+    values = []
+    while True:
+        batch, ok = await recv_many(src, BATCH)
+        if not ok:
+            return values
+        values += batch
+
+
+def call(f):
+    # stages take plain functions and coroutine functions alike
+    if asyncio.iscoroutinefunction(f):
+        async def apply(values):
+            return [await f(value) for value in values]
+    else:
+        async def apply(values):
+            return [f(value) for value in values]
+    return apply
+
+
+def map(f, src, workers=1, ordered=True, capacity=0):
+    # f(value) for every value, by `workers` goroutines. Unless `ordered`
+    # is false the results come out in the order of their inputs.
+    out = make(capacity)
+    apply = call(f)
+
+    if workers == 1 or not ordered:
+        wg = WaitGroup()
+        wg.add(workers)
+
+        async def work():
+            # out is closed once every worker is done, failed or not
+            try:
+                while True:
+                    values, ok = await recv_many(src, BATCH)
+                    if not ok:
+                        break
+                    await send_many(out, await apply(values))
+            except Exception:
+                go(drain(src))
+                raise
+            finally:
+                wg.done()
+
+        async def closer():
+            await wg.wait()
+            close(out)
+
+        for _ in range(workers):
+            go(work())
+        go(closer())
+        return out
+
+    # One goroutine hands out batches, each with a channel for its results,
+    # and queues the result channels in order. The batches are worked on
+    # in parallel and the results are sent on in the order they're queued.
+    jobs = make(workers)
+    pending = make(workers)
+
+    async def dispatch():
+        try:
+            while True:
+                values, ok = await recv_many(src, BATCH)
+                if not ok:
+                    break
+                result = make(1)
+                await send(pending, result)
+                await send(jobs, (values, result))
+        finally:
+            # the workers finish the jobs that are left and exit
+            close(jobs)
+            close(pending)
+
+    async def work():
+        while True:
+            job, ok = await recv(jobs)
+            if not ok:
+                return
+            values, result = job
+            try:
+                values = await apply(values)
+            except BaseException:
+                # tells emit to stop
+                close(result)
+                raise
+            await send(result, values)
+
+    async def emit():
+        try:
+            while True:
+                result, ok = await recv(pending)
+                if not ok:
+                    break
+                values, ok = await recv(result)
+                if not ok:
+                    # f failed on this batch, so no more are handed out
+                    dispatcher.cancel()
+                    go(drain(src))
+                    break
+                await send_many(out, values)
+        finally:
+            close(out)
+
+    dispatcher = go(dispatch())
+    for _ in range(workers):
+        go(work())
+    go(emit())
+    return out
+
+
+def filter(predicate, src, capacity=0):
+    out = make(capacity)
+    apply = call(predicate)
+
+    async def run():
+        try:
+            while True:
+                values, ok = await recv_many(src, BATCH)
+                if not ok:
+                    break
+                keep = await apply(values)
+                await send_many(out, [value for value, k in zip(values, keep) if k])
+        except Exception:
+            go(drain(src))
+            raise
+        finally:
+            close(out)
+
+    go(run())
+    return out
+
+
+def fan_out(src, n, capacity=0):
+    # n channels that share the values, each value goes to whichever is
+    # ready for it. A forwarder only takes as many values as its channel
+    # can buffer, so one slow consumer can't hold up a large batch.
+    outs = [make(capacity) for _ in range(n)]
+
+    async def forward(out):
+        try:
+            while True:
+                values, ok = await recv_many(src, max(capacity, 1))
+                if not ok:
+                    break
+                await send_many(out, values)
+        except Exception:
+            go(drain(src))
+            raise
+        finally:
+            close(out)
+
+    for out in outs:
+        go(forward(out))
+    return outs
+
+
+def fan_in(*srcs, capacity=0):
+    # one channel that receives the values of all of them
+    out = make(capacity)
+    wg = WaitGroup()
+    wg.add(len(srcs))
+
+    async def forward(src):
+        try:
+            while True:
+                values, ok = await recv_many(src, BATCH)
+                if not ok:
+                    break
+                await send_many(out, values)
+        except Exception:
+            go(drain(src))
+            raise
+        finally:
+            wg.done()
+
+    async def closer():
+        await wg.wait()
+        close(out)
+
+    for src in srcs:
+        go(forward(src))
+    go(closer())
+    return out
+
+
+def tee(src, n=2, capacity=0):
+    # n channels that each receive every value, it proceeds at the pace of
+    # the slowest one
+    outs = [make(capacity) for _ in range(n)]
+
+    async def run():
+        try:
+            while True:
+                values, ok = await recv_many(src, BATCH)
+                if not ok:
+                    break
+                for out in outs:
+                    await send_many(out, values)
+        except Exception:
+            go(drain(src))
+            raise
+        finally:
+            for out in outs:
+                close(out)
+
+    go(run())
+    return outs
+
+
+def batch(src, n, timeout=None, capacity=0):
+    # lists of n values, a shorter one is sent once the input is closed or,
+    # given a timeout, once `timeout` seconds have passed since its first
+    # value arrived
+    out = make(capacity)
+
+    async def run():
+        try:
+            while True:
+                values, ok = await recv_many(src, n)
+                if not ok:
+                    break
+                if timeout is None:
+                    while len(values) < n:
+                        more, ok = await recv_many(src, n - len(values))
+                        if not ok:
+                            break
+                        values += more
+                elif len(values) < n:
+                    deadline = timer(timeout)
+                    expired = False
+
+                    async def onrecv(value, ok):
+                        nonlocal expired
+                        if ok:
+                            values.append(value)
+                        else:
+                            expired = True
+
+                    async def ontimeout(now, ok):
+                        nonlocal expired
+                        expired = True
+
+                    while len(values) < n and not expired:
+                        await select([(recv, src, onrecv), (recv, deadline.channel, ontimeout)])
+                        if not expired and len(values) < n:
+                            values += take(src, n - len(values))
+                    deadline.stop()
+                await send(out, values)
+        except Exception:
+            go(drain(src))
+            raise
+        finally:
+            close(out)
+
+    go(run())
+    return out
+
+
+def merge_sorted(*srcs, key=None, capacity=0):
+    # merges channels whose values are each sorted into one sorted channel
+    out = make(capacity)
+
+    async def run():
+        try:
+            heap = []
+            buffers = []
+            for i, src in enumerate(srcs):
+                values, ok = await recv_many(src, BATCH)
+                if ok:
+                    values.reverse()
+                    buffers.append(values)
+                    value = values.pop()
+                    heapq.heappush(heap, (value if key is None else key(value), i, value))
+                else:
+                    buffers.append(None)
+
+            merged = []
+            while heap:
+                _, i, value = heapq.heappop(heap)
+                merged.append(value)
+                values = buffers[i]
+                if not values:
+                    # send what we have before waiting for more
+                    await send_many(out, merged)
+                    merged = []
+                    values, ok = await recv_many(srcs[i], BATCH)
+                    if not ok:
+                        continue
+                    values.reverse()
+                    buffers[i] = values
+                elif len(merged) >= BATCH:
+                    await send_many(out, merged)
+                    merged = []
+                value = values.pop()
+                heapq.heappush(heap, (value if key is None else key(value), i, value))
+            await send_many(out, merged)
+        except Exception:
+            for src in srcs:
+                go(drain(src))
+            raise
+        finally:
+            close(out)
+
+    go(run())
+    return out
@@ -0,0 +1,109 @@
+"""
+Bounded concurrency on top of go(): Group, like golang.org/x/sync/errgroup,
+and Pool, a fixed set of worker goroutines fed through a channel.
+"""
+from . import background, close, go, make, recv, select, send, with_cancel
+from .sync import WaitGroup
+
+
+class Group:
+    # Goroutines started with go() run in a context that is cancelled as
+    # soon as one of them fails, which cancels the rest. wait() raises the
+    # first error.
+
+    def __init__(self, ctx=None):
+        self.ctx = with_cancel(ctx or background())
+        self.wg = WaitGroup()
+        self.error = None
+
+    def go(self, f, *args):
+        self.wg.add(1)
+        task = go(f(*args), ctx=self.ctx)
+        # a done callback rather than a finally clause, as a task that's
+        # cancelled before it started never runs its body
+        task.add_done_callback(self.finish)
+        return task
+
+    def finish(self, task):
+        if not task.cancelled() and task.exception() is not None and self.error is None:
+            self.error = task.exception()
+            self.ctx.cancel()
+        self.wg.done()
+
+    async def wait(self):
+        await self.wg.wait()
+        self.ctx.cancel()
+        if self.error is not None:
+            raise self.error
+
+
+class Pool:
+    # `workers` goroutines take jobs from a channel with room for `backlog`
+    # of them, so submit blocks once the workers fall behind and memory
+    # stays bounded however many jobs there are. Results are collected in
+    # the order the jobs were submitted. The first job to fail cancels the
+    # others and is raised by wait().
+
+    def __init__(self, workers, ctx=None, backlog=None):
+        if workers < 1:
+            raise ValueError("a pool needs at least one worker")
+        self.jobs = make(backlog or workers)
+        self.results = []
+        self.group = Group(ctx)
+        for _ in range(workers):
+            self.group.go(self.work)
+
+    async def work(self):
+        jobs, results = self.jobs, self.results
+        while True:
+            job, ok = await recv(jobs)
+            if not ok:
+                return
+            i, f, args = job
+            results[i] = await f(*args)
+
+    async def submit(self, f, *args):
+        # returns False, dropping the job, once the pool was cancelled
+        done = self.group.ctx.done()
+        if done.closed:
+            return False
+        cancelled = False
+
+        async def sent():
+            pass
+
+        async def stop(value, ok):
+            nonlocal cancelled
+            cancelled = True
+
+        self.results.append(None)
+        await select([(send, self.jobs, (len(self.results) - 1, f, args), sent), (recv, done, stop)])
+        if cancelled:
+            self.results.pop()
+        return not cancelled
+
+    async def wait(self):
+        # no more jobs, returns their results once the workers are done
+        if not self.jobs.closed:
+            close(self.jobs)
+        await self.group.wait()
+        return self.results
+
+    async def map(self, f, items):
+        for item in items:
+            if not await self.submit(f, item):
+                break
+        return await self.wait()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.group.ctx.cancel()
+            try:
+                await self.wait()
+            except Exception:
+                pass
+            return
+        await self.wait()
@@ -0,0 +1,232 @@
+"""
+WaitGroup, Mutex, RWMutex, Once and Semaphore, like Go's sync package and
+golang.org/x/sync/semaphore, for the asyncio runtime.
+
+Methods that can block are coroutines. Parked goroutines are woken in the
+order they parked, each in O(1), and count towards deadlock detection
+under run() like the ones parked on channels.
+"""
+from collections import deque
+import asyncio
+from . import park, unpark
+
+
+class WaitList:
+    # the goroutines parked on a primitive, oldest first, along with how
+    # much of it they are waiting for
+
+    def __init__(self, owner, op):
+        self.waiters = deque()
+        self.blocked = (op, owner)
+
+    def __len__(self):
+        return len(self.waiters)
+
+    async def park(self, lost, weight=1):
+        # Waits to be woken up. If the goroutine is cancelled after it was
+        # woken, what it was handed is passed on with lost().
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append((future, weight))
+        park(future, *self.blocked)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                lost()
+            else:
+                # leave it for wake to skip
+                future.cancel()
+            raise
+        finally:
+            unpark(future)
+
+    def skip(self):
+        # drop the goroutines that were cancelled while parked
+        waiters = self.waiters
+        while waiters and waiters[0][0].done():
+            waiters.popleft()
+        return bool(waiters)
+
+    def weight(self):
+        # what the first goroutine is waiting for
+        return self.waiters[0][1]
+
+    def wake(self):
+        future, _ = self.waiters.popleft()
+        unpark(future)
+        future.set_result(None)
+
+
+class WaitGroup:
+    def __init__(self):
+        self.count = 0
+        self.waiting = WaitList(self, "wait")
+
+    def add(self, delta):
+        self.count += delta
+        if self.count < 0:
+            raise Exception("sync: negative WaitGroup counter")
+        if self.count == 0:
+            while self.waiting.skip():
+                self.waiting.wake()
+
+    def done(self):
+        self.add(-1)
+
+    async def wait(self):
+        if self.count > 0:
+            await self.waiting.park(lambda: None)
+
+
+class Mutex:
+    # unlock hands the mutex straight to the first goroutine waiting for it
+
+    def __init__(self):
+        self.locked = False
+        self.waiting = WaitList(self, "lock")
+
+    async def lock(self):
+        if self.locked:
+            await self.waiting.park(self.unlock)
+        else:
+            self.locked = True
+
+    def try_lock(self):
+        if self.locked:
+            return False
+        self.locked = True
+        return True
+
+    def unlock(self):
+        if not self.locked:
+            raise Exception("sync: unlock of unlocked mutex")
+        if self.waiting.skip():
+            self.waiting.wake()
+        else:
+            self.locked = False
+
+    async def __aenter__(self):
+        await self.lock()
+
+    async def __aexit__(self, *exc_info):
+        self.unlock()
+
+
+class RWMutex:
+    # Once a writer is waiting new readers queue up behind it, and when it
+    # unlocks every reader that queued up is let in before the next writer,
+    # so neither side can starve the other.
+
+    def __init__(self):
+        self.readers = 0
+        self.writer = False
+        self.waiting_readers = WaitList(self, "rlock")
+        self.waiting_writers = WaitList(self, "lock")
+
+    async def rlock(self):
+        if self.writer or self.waiting_writers.skip():
+            await self.waiting_readers.park(self.runlock)
+        else:
+            self.readers += 1
+
+    def runlock(self):
+        if self.readers == 0:
+            raise Exception("sync: RUnlock of unlocked RWMutex")
+        self.readers -= 1
+        if self.readers == 0:
+            if self.waiting_writers.skip():
+                self.writer = True
+                self.waiting_writers.wake()
+            else:
+                # the writer the readers queued up behind gave up
+                while self.waiting_readers.skip():
+                    self.readers += 1
+                    self.waiting_readers.wake()
+
+    async def lock(self):
+        if self.writer or self.readers:
+            await self.waiting_writers.park(self.unlock)
+        else:
+            self.writer = True
+
+    def unlock(self):
+        if not self.writer:
+            raise Exception("sync: Unlock of unlocked RWMutex")
+        self.writer = False
+        if self.waiting_readers.skip():
+            while self.waiting_readers.skip():
+                self.readers += 1
+                self.waiting_readers.wake()
+        elif self.waiting_writers.skip():
+            self.writer = True
+            self.waiting_writers.wake()
+
+
+class Once:
+    # do(f) calls f once, f can be a coroutine function. Like in Go, other
+    # callers wait until the first call has returned.
+
+    def __init__(self):
+        self.done = False
+        self.running = False
+        self.waiting = WaitList(self, "once")
+
+    async def do(self, f):
+        if self.done:
+            return
+        if self.running:
+            await self.waiting.park(lambda: None)
+            return
+        self.running = True
+        try:
+            result = f()
+            if asyncio.iscoroutine(result):
+                await result
+        finally:
+            self.done = True
+            while self.waiting.skip():
+                self.waiting.wake()
+
+
+class Semaphore:
+    # A weighted semaphore. Goroutines are let in in the order they asked,
+    # so a big acquire isn't starved by a stream of small ones.
+
+    def __init__(self, size):
+        self.size = size
+        self.current = 0
+        self.waiting = WaitList(self, "acquire")
+
+    async def acquire(self, n=1):
+        if n > self.size:
+            raise ValueError("semaphore: acquire of more than its size")
+        if self.current + n <= self.size and not self.waiting.skip():
+            self.current += n
+        else:
+            try:
+                await self.waiting.park(lambda: self.release(n), n)
+            except asyncio.CancelledError:
+                # the goroutines queued up behind this one may fit now
+                self.release(0)
+                raise
+
+    def try_acquire(self, n=1):
+        if self.current + n <= self.size and not self.waiting.skip():
+            self.current += n
+            return True
+        return False
+
+    def release(self, n=1):
+        self.current -= n
+        if self.current < 0:
+            raise Exception("semaphore: released more than held")
+        waiting = self.waiting
+        while waiting.skip() and self.current + waiting.weight() <= self.size:
+            self.current += waiting.weight()
+            waiting.wake()
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.release()
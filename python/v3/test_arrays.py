@@ -0,0 +1,74 @@
+import asyncio
+from . import close, go, make, recv, send, stats
+from .arrays import ArrayChannel, recv_array, send_array
+
+
+def test_send_array_recv_array():
+    async def main():
+        ch = make(100, dtype="float64")
+        assert isinstance(ch, ArrayChannel)
+
+        async def produce():
+            for start in range(0, 1000, 300):
+                await send_array(ch, [float(x) for x in range(start, min(start + 300, 1000))])
+            close(ch)
+
+        go(produce())
+        received = []
+        while True:
+            values, ok = await recv_array(ch, 64)
+            if not ok:
+                break
+            assert 0 < len(values) <= 64
+            received += list(values)
+        return received, stats(ch)
+
+    received, s = asyncio.run(main())
+    assert received == [float(x) for x in range(1000)]
+    assert s.sends == s.recvs == 1000
+    assert s.high_water == 100
+
+
+def test_array_channel_takes_plain_sends():
+    async def main():
+        ch = make(3, dtype="int64")
+        await send_array(ch, [1, 2])
+        await send(ch, 3)
+        assert (await recv(ch)) == (1, True)
+        await send(ch, 4)
+
+        # a blocked sender's value goes into the ring once there's room
+        async def late():
+            await send(ch, 5)
+        go(late())
+        await asyncio.sleep(0)
+        assert ch.waiting_to_send
+        values, ok = await recv_array(ch, 10)
+        assert list(values) == [2, 3, 4]
+        assert not ch.waiting_to_send
+
+        # and the ring wraps around
+        await send_array(ch, [6, 7])
+        values, ok = await recv_array(ch, 10)
+        return list(values)
+
+    assert asyncio.run(main()) == [5, 6, 7]
+
+
+def test_unbuffered_array_channel():
+    async def main():
+        ch = make(dtype="int32")
+
+        async def produce():
+            await send_array(ch, range(10))
+            close(ch)
+
+        go(produce())
+        received = []
+        while True:
+            values, ok = await recv_array(ch, 4)
+            if not ok:
+                return received
+            received += list(values)
+
+    assert asyncio.run(main()) == list(range(10))
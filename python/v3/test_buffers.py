@@ -0,0 +1,74 @@
+import asyncio
+import io
+from . import close, go, send
+from .buffers import BufferPool, make_bytes, recv_bytes, send_bytes
+
+
+def test_send_bytes_reuses_slabs():
+    async def main():
+        ch = make_bytes(2, size=1000)
+        data = bytes(range(256)) * 100
+
+        async def produce():
+            await send_bytes(ch, data)
+            await send_bytes(ch, b"")
+            close(ch)
+
+        go(produce())
+        return data, await recv_bytes(ch), ch.pool
+
+    data, received, pool = asyncio.run(main())
+    assert received == data
+    # 26 slabs went through a channel that holds 2
+    assert pool.allocated <= 4
+    assert pool.allocated + pool.reused == 26
+
+
+def test_readinto_slab():
+    async def main():
+        ch = make_bytes(size=7)
+        src = io.BytesIO(b"streaming through a channel")
+
+        async def produce():
+            while True:
+                slab = ch.pool.get()
+                n = src.readinto(slab.data)
+                if not n:
+                    slab.release()
+                    break
+                slab.truncate(n)
+                await send(ch, slab)
+            close(ch)
+
+        go(produce())
+        chunks = []
+        async for slab in ch:
+            chunks.append(bytes(slab.data))
+            slab.release()
+        return chunks
+
+    assert asyncio.run(main()) == [b"streami", b"ng thro", b"ugh a c", b"hannel"]
+
+
+def test_released_slab():
+    pool = BufferPool(16, keep=1)
+    a, b = pool.get(), pool.get()
+    a.release()
+    try:
+        a.data[0]
+    except ValueError:
+        pass
+    else:
+        assert False, "read a released slab"
+    try:
+        a.release()
+    except Exception as e:
+        assert "released slab" in str(e)
+    else:
+        assert False, "released a slab twice"
+    # only one free buffer is kept
+    b.release()
+    assert len(pool.free) == 1
+    free = pool.free[0]
+    assert pool.get().buffer is free
+    assert pool.reused == 1
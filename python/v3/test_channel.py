@@ -0,0 +1,191 @@
+import asyncio
+import gc
+import logging
+from . import Deadlock, close, go, make, no_waiters, recv, recv_many, run, select, send, send_many, stats
+
+
+def test_send_many_recv_many():
+    async def main():
+        ch = make(4)
+
+        async def producer():
+            await send_many(ch, range(10))
+            close(ch)
+        go(producer())
+        # let the producer fill the buffer and block
+        await asyncio.sleep(0)
+
+        values, ok = await recv_many(ch, 100)
+        assert ok and values == [0, 1, 2, 3, 4]
+        values, ok = await recv_many(ch, 2)
+        assert ok and values == [5, 6]
+        values, ok = await recv_many(ch, 100)
+        assert ok and values == [7, 8, 9]
+        assert (await recv_many(ch, 100)) == ([], False)
+    asyncio.run(main())
+
+
+def test_async_for():
+    async def main():
+        ch = make()
+
+        async def producer():
+            await send_many(ch, range(200))
+            close(ch)
+        go(producer())
+
+        assert [value async for value in ch] == list(range(200))
+    asyncio.run(main())
+
+
+def test_async_for_break_leaves_the_rest():
+    async def main():
+        ch = make(10)
+        await send_many(ch, range(10))
+        close(ch)
+        async for value in ch:
+            if value == 1:
+                break
+        return stats(ch).len, await recv(ch)
+
+    assert asyncio.run(main()) == (8, (2, True))
+
+
+def test_deadlock_report():
+    async def forgotten_receiver(ch):
+        await recv(ch)
+
+    async def main():
+        ch = make()
+        go(forgotten_receiver(ch))
+        await send(None, 1)
+
+    try:
+        run(main())
+    except Deadlock as e:
+        assert sorted(op for op, _, _ in e.blocked) == ["recv", "send"]
+        assert "forgotten_receiver" in str(e)
+    else:
+        assert False, "expected a deadlock"
+
+
+def test_run_returns_when_main_does():
+    async def main():
+        ch = make()
+        go(recv(ch))
+        await send(ch, 1)
+        # left blocked when main returns, like in Go
+        go(recv(ch))
+        return "done"
+
+    # and nothing is logged about them
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("asyncio")
+    logger.addHandler(handler)
+    try:
+        assert run(main()) == "done"
+        gc.collect()
+    finally:
+        logger.removeHandler(handler)
+    assert records == []
+
+
+def test_stats():
+    async def main():
+        ch = make()
+        go(send(ch, 1))
+        await asyncio.sleep(0)
+        await recv(ch)
+
+        async def onrecv(value, ok):
+            pass
+
+        go(send(ch, 2))
+        await select([(recv, ch, onrecv), (recv, make(), onrecv)])
+        return stats(ch)
+
+    s = asyncio.run(main())
+    assert (s.sends, s.recvs, s.handoffs, s.buffered, s.high_water) == (2, 2, 2, 0, 0)
+    # the first sender parked, the select parked until the second one came
+    assert (s.send_parks, s.recv_parks) == (1, 1)
+    assert s.select_wins == 1
+
+
+def test_waiters_are_reused():
+    async def main():
+        ch = make()
+        waiters = set()
+        for i in range(3):
+            go(send(ch, i))
+            await asyncio.sleep(0)
+            waiters.add(ch.waiting_to_send.waiters[0])
+            assert await recv(ch) == (i, True)
+            # the sender resumes and puts its waiter back on the free list
+            await asyncio.sleep(0)
+        return waiters
+
+    assert len(asyncio.run(main())) == 1
+
+
+def test_cancel_parked_recv():
+    async def main():
+        ch = make()
+        task = go(recv(ch))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert not ch.waiting_to_recv
+        try:
+            await asyncio.wait_for(recv(None), 0.001)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(main())
+
+
+def test_send_skips_cancelled_recv():
+    async def main():
+        ch = make()
+        cancelled = go(recv(ch))
+        second = go(recv(ch))
+        await asyncio.sleep(0)
+        # cancelled, but it hasn't resumed yet when the send comes
+        cancelled.cancel()
+        await send(ch, 42)
+        try:
+            await cancelled
+        except asyncio.CancelledError:
+            pass
+        else:
+            assert False, "recv wasn't cancelled"
+        return await second
+
+    assert asyncio.run(main()) == (42, True)
+
+
+def test_run_on_uvloop_if_installed():
+    async def main():
+        ch = make()
+        go(send(ch, 1))
+        return await recv(ch)
+
+    assert run(main(), uvloop=True) == (1, True)
+
+
+def test_waiting_queues_are_made_on_first_park():
+    async def main():
+        ch = make()
+        assert not hasattr(ch, "__dict__")
+        assert ch.waiting_to_send is ch.waiting_to_recv is no_waiters
+        task = go(recv(ch))
+        await asyncio.sleep(0)
+        assert ch.waiting_to_send is no_waiters
+        assert ch.waiting_to_recv is not no_waiters
+        await send(ch, 1)
+        assert await task == (1, True)
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+import asyncio
+from . import Canceled, DeadlineExceeded, background, close, go, make, recv, select, send, with_cancel, with_timeout
+
+
+def test_cancel_tree():
+    async def main():
+        ch = make()
+        root = with_cancel(background())
+        child = with_cancel(root)
+        grandchild = with_timeout(child, 10)
+
+        parked = [go(send(ch, i), ctx=ctx) for i, ctx in enumerate([root, child, grandchild])]
+        parked.append(go(recv(make()), ctx=grandchild))
+        await asyncio.sleep(0)
+        assert len(ch.waiting_to_send) == 3
+
+        root.cancel()
+        await asyncio.sleep(0)
+        assert all(task.cancelled() for task in parked)
+        # the parked senders are gone from the channel
+        assert len(ch.waiting_to_send) == 0
+        assert isinstance(grandchild.err(), Canceled)
+        assert not root.children and not root.tasks
+
+        # a context made from a cancelled one starts out cancelled
+        late = with_cancel(root)
+        task = go(recv(ch), ctx=late)
+        await asyncio.sleep(0)
+        assert task.cancelled()
+
+    asyncio.run(main())
+
+
+def test_done_channel_and_deadline():
+    async def main():
+        ctx = with_timeout(background(), 0.01)
+        results = []
+
+        async def ondone(value, ok):
+            results.append(ok)
+
+        async def onrecv(value, ok):
+            results.append(value)
+
+        await select([(recv, ctx.done(), ondone), (recv, make(), onrecv)])
+        assert results == [False]
+        assert isinstance(ctx.err(), DeadlineExceeded)
+
+        # children can't outlive their parent's deadline
+        parent = with_timeout(background(), 1)
+        assert with_timeout(parent, 10).deadline == parent.deadline
+        parent.cancel()
+
+    asyncio.run(main())
+
+
+def test_cancel_after_recv_was_handed_a_value():
+    async def main():
+        async def onrecv(value, ok):
+            assert False, "the select was cancelled"
+
+        for capacity in (0, 1, 2):
+            ch = make(capacity)
+            ctx = with_cancel(background())
+            receivers = [go(recv(ch), ctx=ctx),
+                         go(select([(recv, ch, onrecv), (recv, make(), onrecv)]), ctx=ctx)]
+            await asyncio.sleep(0)
+            # both receivers are handed a value, then cancelled before they
+            # get to run
+            await send(ch, 1)
+            await send(ch, 2)
+            ctx.cancel()
+            for i in range(3, 3 + capacity + 1):
+                go(send(ch, i))
+            await asyncio.sleep(0)
+            assert all(task.cancelled() for task in receivers)
+            # nothing was lost, and the values given back come first
+            values = [(await recv(ch))[0] for _ in range(capacity + 3)]
+            assert sorted(values[:2]) == [1, 2]
+            assert values[2:] == list(range(3, capacity + 4))
+
+    asyncio.run(main())
+
+
+def test_close_after_value_was_given_back():
+    async def main():
+        ch = make()
+        receiver = go(recv(ch))
+        await asyncio.sleep(0)
+        await send(ch, 1)
+        receiver.cancel()
+        await asyncio.sleep(0)
+        assert receiver.cancelled()
+        # the value was sent before the close, so it is still received
+        close(ch)
+        return await recv(ch), await recv(ch)
+
+    assert asyncio.run(main()) == ((1, True), (None, False))
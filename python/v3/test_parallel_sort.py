@@ -0,0 +1,53 @@
+import asyncio
+import random
+from concurrent.futures import ProcessPoolExecutor
+from .parallel_sort import merge, parallel_sort
+
+
+def test_merge():
+    xs = [1, 4, 6, 9, 2, 3, 7, 10, 11]
+    merge(xs, 0, 4, len(xs))
+    assert xs == sorted(xs)
+
+
+def test_parallel_sort():
+    xs = [random.randrange(1000) for _ in range(10000)]
+    assert asyncio.run(parallel_sort(xs, cutoff=100)) == sorted(xs)
+    assert asyncio.run(parallel_sort([2, 3, 1, 5, 4], cutoff=1)) == [1, 2, 3, 4, 5]
+    assert asyncio.run(parallel_sort([])) == []
+
+
+class Record:
+    # compares by key alone, so records with equal keys are only kept in
+    # order by a stable sort
+    def __init__(self, key, index):
+        self.key = key
+        self.index = index
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def __le__(self, other):
+        return self.key <= other.key
+
+
+def test_parallel_sort_is_stable():
+    xs = [Record(random.randrange(10), i) for i in range(1000)]
+    result = asyncio.run(parallel_sort(xs, cutoff=7))
+    assert [(r.key, r.index) for r in result] == sorted((r.key, r.index) for r in xs)
+
+
+def test_parallel_sort_raises_comparison_errors():
+    xs = [random.random() for _ in range(100)] + ["a"]
+    try:
+        asyncio.run(parallel_sort(xs, cutoff=7))
+    except TypeError:
+        pass
+    else:
+        assert False, "sorted numbers and a string"
+
+
+def test_parallel_sort_in_processes():
+    xs = [random.random() for _ in range(20000)]
+    with ProcessPoolExecutor(2) as executor:
+        assert asyncio.run(parallel_sort(xs, cutoff=5000, executor=executor)) == sorted(xs)
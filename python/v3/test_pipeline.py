@@ -0,0 +1,129 @@
+import asyncio
+from . import close, go, make, send
+from .pipeline import batch, collect, fan_in, fan_out, filter, map, merge_sorted, source, tee
+
+
+def test_map_filter():
+    async def main():
+        squares = map(lambda x: x * x, source(range(200)))
+        return await collect(filter(lambda x: x % 2 == 0, squares))
+
+    assert asyncio.run(main()) == [x * x for x in range(0, 200, 2)]
+
+
+def test_parallel_map_keeps_order():
+    async def main():
+        async def slow_double(x):
+            # later batches finish first
+            await asyncio.sleep(0.001 if x < 64 else 0)
+            return x * 2
+
+        ordered = await collect(map(slow_double, source(range(500)), workers=4))
+        unordered = await collect(map(slow_double, source(range(500)), workers=4, ordered=False))
+        return ordered, unordered
+
+    ordered, unordered = asyncio.run(main())
+    assert ordered == [x * 2 for x in range(500)]
+    assert sorted(unordered) == ordered
+
+
+def test_fan_out_fan_in():
+    async def main():
+        outs = fan_out(source(range(100)), 3)
+        doubled = [map(lambda x: x * 2, out) for out in outs]
+        return await collect(fan_in(*doubled))
+
+    assert sorted(asyncio.run(main())) == [x * 2 for x in range(100)]
+
+
+def test_tee():
+    async def main():
+        a, b, c = tee(source(range(100)), 3)
+        return await asyncio.gather(collect(a), collect(b), collect(c))
+
+    assert asyncio.run(main()) == [list(range(100))] * 3
+
+
+def test_batch():
+    async def main():
+        src = make()
+
+        async def produce():
+            for i in range(5):
+                await send(src, i)
+            # the batch of 3 waiting for its last value times out
+            await asyncio.sleep(0.05)
+            await send(src, 5)
+            close(src)
+
+        go(produce())
+        return await collect(batch(src, 3, timeout=0.01))
+
+    assert asyncio.run(main()) == [[0, 1, 2], [3, 4], [5]]
+
+
+def test_batch_without_timeout_fills_up():
+    async def main():
+        return await collect(batch(source(range(10)), 4))
+
+    assert asyncio.run(main()) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+async def settled():
+    # whether every goroutine but the current one finishes within a second,
+    # including the ones they start
+    while True:
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        if not tasks:
+            return True
+        _, pending = await asyncio.wait(tasks, timeout=1)
+        if pending:
+            return False
+
+
+def test_failed_stage_closes_its_output():
+    def check(x):
+        if x == 100:
+            raise ValueError(x)
+        return True
+
+    def numbers():
+        for x in range(1000):
+            check(x)
+            yield x
+
+    async def main():
+        for stage in (lambda src: filter(check, src),
+                      lambda src: map(check, src),
+                      lambda src: map(check, src, workers=4),
+                      lambda src: map(check, src, workers=4, ordered=False)):
+            # the values of the batches before the one that failed come
+            # through, at most, and then the output is closed
+            values = await asyncio.wait_for(collect(stage(source(range(1000)))), 1)
+            assert len(values) < 1000
+            # and the source is drained
+            assert await settled()
+
+        # stages after one that failed
+        for stage in (lambda src: [map(lambda x: x, src)],
+                      lambda src: [filter(lambda x: True, src)],
+                      lambda src: [fan_in(src, source(range(10)))],
+                      lambda src: fan_out(src, 3),
+                      lambda src: tee(src, 3),
+                      lambda src: [batch(src, 7)],
+                      lambda src: [batch(src, 7, timeout=1)],
+                      lambda src: [merge_sorted(src, source(range(10)))]):
+            outs = stage(source(numbers()))
+            await asyncio.wait_for(asyncio.gather(*[collect(out) for out in outs]), 1)
+            assert await settled()
+
+    asyncio.run(main())
+
+
+def test_merge_sorted():
+    async def main():
+        srcs = [source(range(i, 300, 3)) for i in range(3)]
+        srcs.append(source([]))
+        return await collect(merge_sorted(*srcs))
+
+    assert asyncio.run(main()) == list(range(300))
@@ -0,0 +1,78 @@
+import asyncio
+from . import recv, with_cancel, background
+from .pool import Group, Pool
+
+
+def test_pool_map():
+    async def main():
+        running = [0]
+        peak = [0]
+
+        async def square(x):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0)
+            running[0] -= 1
+            return x * x
+
+        pool = Pool(4)
+        results = await pool.map(square, range(100))
+        assert pool.jobs.buffer.high_water <= 4
+        return results, peak[0]
+
+    results, peak = asyncio.run(main())
+    assert results == [x * x for x in range(100)]
+    assert 1 < peak <= 4
+
+
+def test_pool_first_error_cancels():
+    async def main():
+        started = []
+
+        async def job(x):
+            started.append(x)
+            if x == 3:
+                raise ValueError(x)
+            await asyncio.sleep(10)
+
+        pool = Pool(4)
+        try:
+            await pool.map(job, range(10 ** 6))
+        except ValueError as e:
+            assert e.args == (3,)
+        else:
+            assert False, "expected the job's error"
+        assert len(started) < 10
+        assert not await pool.submit(job, 0)
+
+    asyncio.run(main())
+
+
+def test_group():
+    async def main():
+        parent = with_cancel(background())
+        group = Group(parent)
+        cancelled = []
+
+        async def blocked():
+            try:
+                await recv(group.ctx.done())
+            finally:
+                cancelled.append(True)
+
+        async def fail():
+            raise KeyError("boom")
+
+        group.go(blocked)
+        group.go(fail)
+        try:
+            await group.wait()
+        except KeyError:
+            pass
+        else:
+            assert False, "expected the goroutine's error"
+        assert cancelled == [True]
+        # the parent context is left alone
+        assert parent.err() is None
+
+    asyncio.run(main())
@@ -1,5 +1,5 @@
 import asyncio
-from . import Channel, select, send, make, close, recv, go
+from . import PRIORITY, RANDOM, ROUND_ROBIN, SelectSet, default, seed, select, send, make, close, recv, go
 
 
 async def copy(dst, src):
@@ -69,3 +69,187 @@ def test_select():
         result = await recvall(c1)
         assert [x for x in sorted(result)] == [1, 2, 3, 4, 5, 6]
     asyncio.run(main())
+
+
+def test_select_set():
+    async def main():
+        channels = [make(1) for _ in range(10)]
+        received = []
+
+        async def onrecv(value, ok):
+            received.append(value)
+
+        async def ondefault():
+            received.append(None)
+
+        selectset = SelectSet([(recv, ch, onrecv) for ch in channels] + [(default, ondefault)])
+        await select(selectset)
+        await send(channels[3], 3)
+        await select(selectset)
+        await select(selectset)
+        assert received == [None, 3, None]
+        selectset.close()
+    asyncio.run(main())
+
+
+def test_select_blocks_until_ready():
+    async def main():
+        c1, c2 = make(), make()
+        received = []
+
+        async def onrecv1(value, ok):
+            received.append(("c1", value))
+
+        async def onrecv2(value, ok):
+            received.append(("c2", value))
+
+        async def sender():
+            await send(c2, 5)
+            await send(c1, 6)
+        go(sender())
+
+        await select([(recv, c1, onrecv1), (recv, c2, onrecv2)])
+        assert received == [("c2", 5)]
+        assert not c1.waiting_to_recv
+        assert (await recv(c1)) == (6, True)
+    asyncio.run(main())
+
+
+def test_cancelled_select_leaves_no_waiters():
+    async def main():
+        channels = [make() for _ in range(3)]
+
+        async def onrecv(value, ok):
+            pass
+
+        task = asyncio.ensure_future(select([(recv, ch, onrecv) for ch in channels]))
+        await asyncio.sleep(0)
+        assert all(ch.waiting_to_recv for ch in channels)
+        task.cancel()
+        await asyncio.sleep(0)
+        assert not any(ch.waiting_to_recv for ch in channels)
+    asyncio.run(main())
+
+
+def test_send_and_close_after_cancelled_select():
+    async def main():
+        a, b = make(), make()
+        received = []
+
+        async def onrecv(value, ok):
+            received.append(value)
+
+        async def onsend():
+            pass
+
+        task = go(select([(recv, a, onrecv), (send, b, 1, onsend)]))
+        other = go(recv(a))
+        await asyncio.sleep(0)
+        # neither the send nor the close may hand anything to the select
+        # before it resumes
+        task.cancel()
+        await send(a, 2)
+        close(b)
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        else:
+            assert False, "select wasn't cancelled"
+        assert received == []
+        return await other
+
+    assert asyncio.run(main()) == (2, True)
+
+
+def picks(policy, selects, selectset=False):
+    # the channels that a run of selects over 4 ready channels picked
+    async def main():
+        channels = [make(selects) for _ in range(4)]
+        for ch in channels:
+            for _ in range(selects):
+                await send(ch, ch)
+        picked = []
+
+        async def onrecv(value, ok):
+            picked.append(channels.index(value))
+
+        cases = [(recv, ch, onrecv) for ch in channels]
+        if selectset:
+            cases = SelectSet(cases, policy)
+        for _ in range(selects):
+            await select(cases, policy)
+        return picked
+    return asyncio.run(main())
+
+
+def test_cancelled_goroutine_leaves_select_set():
+    async def main():
+        for op in (send, recv):
+            ch = make()
+            ready = []
+
+            async def onready(*args):
+                ready.append(True)
+
+            async def ondefault():
+                ready.append(False)
+
+            if op is send:
+                parked = go(send(ch, 1))
+                selectset = SelectSet([(recv, ch, onready), (default, ondefault)])
+            else:
+                parked = go(recv(ch))
+                selectset = SelectSet([(send, ch, 1, onready), (default, ondefault)])
+            await asyncio.sleep(0)
+            assert selectset.poll()
+            parked.cancel()
+            await asyncio.sleep(0)
+            await asyncio.wait_for(select(selectset), 1)
+            assert ready == [False]
+            selectset.close()
+    asyncio.run(main())
+
+
+def test_select_seed_is_reproducible():
+    for selectset in (False, True):
+        seed(7)
+        first = picks(RANDOM, 50, selectset)
+        seed(7)
+        assert picks(RANDOM, 50, selectset) == first
+        assert len(set(first)) == 4
+
+
+def test_select_priority():
+    assert picks(PRIORITY, 8) == [0] * 8
+    assert picks(PRIORITY, 8, selectset=True) == [0] * 8
+
+
+def test_select_round_robin():
+    assert picks(ROUND_ROBIN, 8, selectset=True) == [0, 1, 2, 3] * 2
+    seed()
+    assert picks(ROUND_ROBIN, 8) == [0, 1, 2, 3] * 2
+
+
+def test_interleaved_select_sets_take_turns():
+    # each set keeps its own turn, however its selects are interleaved
+    # with the others'
+    async def main():
+        picked = [[], []]
+        selectsets = []
+        for i in range(2):
+            channels = [make(8) for _ in range(4)]
+            for j, ch in enumerate(channels):
+                for _ in range(8):
+                    await send(ch, j)
+
+            async def onrecv(value, ok, i=i):
+                picked[i].append(value)
+
+            selectsets.append(SelectSet([(recv, ch, onrecv) for ch in channels], ROUND_ROBIN))
+        for _ in range(8):
+            for selectset in selectsets:
+                await select(selectset)
+        return picked
+
+    assert asyncio.run(main()) == [[0, 1, 2, 3] * 2] * 2
@@ -0,0 +1,136 @@
+import asyncio
+from . import Deadlock, go, run
+from .sync import Mutex, Once, RWMutex, Semaphore, WaitGroup
+
+
+def test_wait_group():
+    async def main():
+        wg = WaitGroup()
+        results = []
+
+        async def worker(i):
+            await asyncio.sleep(0)
+            results.append(i)
+            wg.done()
+
+        wg.add(3)
+        for i in range(3):
+            go(worker(i))
+        await wg.wait()
+        return results
+
+    assert sorted(asyncio.run(main())) == [0, 1, 2]
+
+
+def test_mutex():
+    async def main():
+        mu = Mutex()
+        counter = [0]
+
+        async def increment():
+            async with mu:
+                value = counter[0]
+                await asyncio.sleep(0)
+                counter[0] = value + 1
+
+        await asyncio.gather(*[increment() for _ in range(10)])
+        return counter[0]
+
+    assert asyncio.run(main()) == 10
+
+
+def test_mutex_cancelled_while_waiting():
+    async def main():
+        mu = Mutex()
+        await mu.lock()
+        waiter = go(mu.lock())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        mu.unlock()
+        # the cancelled waiter didn't take the mutex with it
+        assert mu.try_lock()
+
+    asyncio.run(main())
+
+
+def test_rwmutex():
+    async def main():
+        rw = RWMutex()
+        results = []
+
+        async def reader(name):
+            await rw.rlock()
+            results.append(name)
+
+        async def writer():
+            await rw.lock()
+            results.append("w")
+
+        await rw.rlock()
+        go(writer())
+        await asyncio.sleep(0)
+        go(reader("r"))
+        await asyncio.sleep(0)
+        assert results == []
+        rw.runlock()
+        await asyncio.sleep(0)
+        rw.unlock()
+        await asyncio.sleep(0)
+        return results
+
+    assert asyncio.run(main()) == ["w", "r"]
+
+
+def test_once():
+    async def main():
+        once = Once()
+        calls = []
+
+        async def init():
+            await asyncio.sleep(0)
+            calls.append(1)
+
+        async def use():
+            await once.do(init)
+            # everyone sees init done
+            assert calls == [1]
+
+        await asyncio.gather(use(), use(), use())
+
+    asyncio.run(main())
+
+
+def test_weighted_semaphore():
+    async def main():
+        sem = Semaphore(2)
+        running = [0]
+        peak = [0]
+
+        async def job():
+            async with sem:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0)
+                running[0] -= 1
+
+        await asyncio.gather(*[job() for _ in range(10)])
+        await sem.acquire(2)
+        assert not sem.try_acquire()
+        return peak[0]
+
+    assert asyncio.run(main()) == 2
+
+
+def test_deadlock_on_wait_group():
+    async def main():
+        wg = WaitGroup()
+        wg.add(1)
+        await wg.wait()
+
+    try:
+        run(main())
+    except Deadlock as e:
+        assert [(op, owner.__class__) for op, owner, _ in e.blocked] == [("wait", WaitGroup)]
+    else:
+        assert False, "expected a deadlock"
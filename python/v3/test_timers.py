@@ -0,0 +1,96 @@
+import asyncio
+from . import Deadlock, after, after_func, make, recv, run, select, ticker, timer
+
+
+def test_select_timeout():
+    async def main():
+        ch = make()
+        results = []
+
+        async def onrecv(value, ok):
+            results.append("received")
+
+        async def ontimeout(now, ok):
+            results.append("timeout")
+
+        await select([(recv, ch, onrecv), (recv, after(0.01), ontimeout)])
+        # the timed out select doesn't leave a waiter behind
+        assert not ch.waiting_to_recv
+        return results
+
+    assert asyncio.run(main()) == ["timeout"]
+
+
+def test_timers_fire_in_order():
+    async def main():
+        results = []
+
+        def record(seconds):
+            async def f():
+                results.append(seconds)
+            return f
+
+        for seconds in [0.03, 0.01, 0.02]:
+            after_func(seconds, record(seconds))
+        await asyncio.sleep(0.05)
+        return results
+
+    assert asyncio.run(main()) == [0.01, 0.02, 0.03]
+
+
+def test_stop_and_ticker():
+    async def main():
+        t = timer(0.01)
+        assert t.stop()
+        assert not t.stop()
+        t.reset(0.01)
+        await recv(t.channel)
+
+        tick = ticker(0.005)
+        ticks = [(await recv(tick.channel))[0] for _ in range(3)]
+        tick.stop()
+        return ticks
+
+    ticks = asyncio.run(main())
+    assert len(ticks) == 3 and ticks == sorted(ticks)
+
+
+def test_deadlock_waits_for_timers():
+    async def main():
+        # parked on a timer isn't a deadlock
+        await recv(after(0.01))
+        # but a timer nobody waits on doesn't keep anything alive
+        ticker(0.01)
+        await recv(make())
+
+    try:
+        run(main())
+    except Deadlock as e:
+        assert [op for op, _, _ in e.blocked] == ["recv"]
+    else:
+        assert False, "expected a deadlock"
+
+
+def test_timers_count_what_they_can_wake():
+    async def main():
+        async def onrecv(value, ok):
+            pass
+
+        t = timer(10)
+        wheel = t.timers
+        task = asyncio.ensure_future(select([(recv, make(), onrecv), (recv, t.channel, onrecv)]))
+        await asyncio.sleep(0)
+        assert wheel.wakers == 1
+        task.cancel()
+        assert wheel.wakers == 0
+
+        task = asyncio.ensure_future(recv(t.channel))
+        await asyncio.sleep(0)
+        assert wheel.wakers == 1
+        t.reset(0.001)
+        assert wheel.wakers == 1
+        await task
+        assert wheel.wakers == 0
+        assert not t.stop()
+
+    asyncio.run(main())